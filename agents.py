@@ -10,6 +10,353 @@ import shared
 
 import math
 
+class Perception(object):
+	"""
+	Everything that an agent can sense at one moment.
+	
+	The agents within sight are gathered in a single pass over the field, the
+	first time they are asked for. Pheromones are kept by the field in
+	partitions of one type and colony each, so every query gathers only the
+	partitions it matches. Line-of-sight checks, which cost far more than the
+	pass itself, are only made for the entities that a query actually
+	returns, and their results are remembered, so several decisions can be
+	made from one Perception without searching the field again.
+	
+	Pheromones and paths do not change while agents read a field, so both are
+	also cached by the field itself; agents that share a space, such as those
+	just dispatched from a hill, share the work.
+	
+	Most decisions only need the best match, so getNearestAgent(),
+	getStrongestPheromone() and hasAgent() stop at the first candidate whose
+	path is clear instead of ordering every candidate. Unless a predicate is
+	given, getStrongestPheromone() does not gather at all: it combines the
+	field's shared answers for each type and colony of pheromone.
+	"""
+	_field = None #: The state-field being sensed.
+	_observer = None #: The agent doing the sensing, which will never perceive itself.
+	_position = None #: The (x, y) co-ordinates from which the field is sensed.
+	_sight = None #: Agents can be detected within this radius.
+	_smell = None #: Pheromones are considered this much closer for inverse-square calculations.
+	_agent_types = None #: The types of agent to be gathered, or None if all are of interest.
+	_pheromone_types = None #: The types of pheromone to be gathered, or None if all are of interest.
+	_agents = None #: (rank, agent) pairs for the agents within sight, where lower ranks are nearer, or None if not yet gathered.
+	
+	def __init__(self, field, observer, position, sight, smell, agent_types=None, pheromone_types=None):
+		"""
+		Creates a new Perception.
+		
+		@type field: map.Field
+		@param field: The state-field from which information about the
+		    environment will be read.
+		@type observer: Agent
+		@param observer: The agent doing the sensing.
+		@type position: tuple
+		@param position: The (x, y) co-ordinates from which the field is sensed.
+		@type sight: int
+		@param sight: The radius within which agents can be seen.
+		@type smell: int
+		@param smell: The strength of the observer's sense of smell.
+		@type agent_types: sequence
+		@param agent_types: The types of agent that may be of interest. All
+		    agents will be gathered if not specified.
+		@type pheromone_types: sequence
+		@param pheromone_types: The types of pheromone that may be of interest.
+		    All pheromones will be gathered if not specified.
+		"""
+		self._field = field
+		self._observer = observer
+		self._position = position
+		self._sight = sight
+		self._smell = smell
+		self._agent_types = agent_types
+		self._pheromone_types = pheromone_types
+		
+	def getAgents(self, types=None, colony=None, invert_colony=False):
+		"""
+		Returns the agents that can be seen and match the specified criteria.
+		
+		@type types: sequence
+		@param types: A filter that will be applied to limit the agents returned.
+		    All agents will be returned if not specified.
+		@type colony: colony.Colony
+		@param colony: A filter that will be applied to limit the agents
+		    returned. All agents will be returned if not specified.
+		@type invert_colony: bool
+		@param invert_colony: True if all colonies other than the one specified
+		    should be returned.
+		
+		@rtype: list
+		@return: The matching agents, in order of increasing distance.
+		"""
+		agents = self._matchAgents(types, colony, invert_colony)
+		agents.sort()
+		return [agent for (rank, agent) in agents if self._canSee(agent)]
+		
+	def getNearestAgent(self, types=None, colony=None, invert_colony=False, predicate=None):
+		"""
+		Returns the nearest agent that can be seen and matches the specified
+		criteria.
+		
+		@type types: sequence
+		@param types: A filter that will be applied to limit the agents
+		    considered. All agents will be considered if not specified.
+		@type colony: colony.Colony
+		@param colony: A filter that will be applied to limit the agents
+		    considered. All agents will be considered if not specified.
+		@type invert_colony: bool
+		@param invert_colony: True if all colonies other than the one specified
+		    should be considered.
+		@type predicate: callable
+		@param predicate: A function that must return True for an agent to be
+		    considered, or None if all agents are acceptable.
+		
+		@rtype: Agent
+		@return: The nearest matching agent, or None if there is none.
+		"""
+		agents = self._matchAgents(types, colony, invert_colony, predicate)
+		while agents:
+			nearest = min(agents)
+			if self._canSee(nearest[1]):
+				return nearest[1]
+			agents.remove(nearest)
+		return None
+		
+	def getPheromones(self, types=None, colony=None):
+		"""
+		Returns the pheromones that can be smelled and match the specified
+		criteria. Pheromones associated with threats match every colony.
+		
+		@type types: sequence
+		@param types: A filter that will be applied to limit the pheromones
+		    returned. All pheromones will be returned if not specified.
+		@type colony: colony.Colony
+		@param colony: A filter that will be applied to limit the pheromones
+		    returned. All pheromones will be returned if not specified.
+		
+		@rtype: list
+		@return: The matching pheromones, in order of decreasing perceived
+		    intensity.
+		"""
+		pheromones = self._matchPheromones(types, colony)
+		pheromones.sort()
+		pheromones.reverse()
+		return [pheromone for (intensity, pheromone) in pheromones if self._canSmell(pheromone)]
+		
+	def getStrongestPheromone(self, types=None, colony=None, predicate=None):
+		"""
+		Returns the pheromone with the greatest perceived intensity that can be
+		smelled and matches the specified criteria. Pheromones associated with
+		threats match every colony.
+		
+		@type types: sequence
+		@param types: A filter that will be applied to limit the pheromones
+		    considered. All pheromones will be considered if not specified.
+		@type colony: colony.Colony
+		@param colony: A filter that will be applied to limit the pheromones
+		    considered. All pheromones will be considered if not specified.
+		@type predicate: callable
+		@param predicate: A function that must return True for a pheromone to be
+		    considered, or None if all pheromones are acceptable.
+		
+		@rtype: inerts.Pheromone
+		@return: The strongest matching pheromone, or None if there is none.
+		"""
+		if predicate is None:
+			strongest = None
+			for key in self._getPheromoneKeys(types, colony):
+				candidate = self._field.getStrongestPheromone(self._position, self._smell, key)
+				if candidate and (strongest is None or candidate > strongest):
+					strongest = candidate
+			return strongest and strongest[1]
+			
+		pheromones = self._matchPheromones(types, colony, predicate)
+		while pheromones:
+			strongest = max(pheromones)
+			if self._canSmell(strongest[1]):
+				return strongest[1]
+			pheromones.remove(strongest)
+		return None
+		
+	def hasAgent(self, types=None, colony=None, invert_colony=False, predicate=None):
+		"""
+		Indicates whether any agent that matches the specified criteria can be
+		seen.
+		
+		@type types: sequence
+		@param types: A filter that will be applied to limit the agents
+		    considered. All agents will be considered if not specified.
+		@type colony: colony.Colony
+		@param colony: A filter that will be applied to limit the agents
+		    considered. All agents will be considered if not specified.
+		@type invert_colony: bool
+		@param invert_colony: True if all colonies other than the one specified
+		    should be considered.
+		@type predicate: callable
+		@param predicate: A function that must return True for an agent to be
+		    considered, or None if all agents are acceptable.
+		
+		@rtype: bool
+		@return: True if a matching agent can be seen.
+		"""
+		for (rank, agent) in self._matchAgents(types, colony, invert_colony, predicate):
+			if self._canSee(agent):
+				return True
+		return False
+		
+	def _canSee(self, agent):
+		"""
+		Indicates whether the path from the observer to an agent within sight
+		is clear, consulting the field only once for each position.
+		
+		@type agent: Agent
+		@param agent: The agent being evaluated.
+		
+		@rtype: bool
+		@return: True if the agent can be seen.
+		"""
+		if self._sight == 1: #Adjacent spaces are always in sight.
+			return True
+		return self._isClear(agent.getPosition(), False)
+		
+	def _canSmell(self, pheromone):
+		"""
+		Indicates whether the path from the observer to a pheromone that is
+		strong enough to be smelled is clear of walls and sponges, consulting
+		the field only once for each position.
+		
+		@type pheromone: inerts.Pheromone
+		@param pheromone: The pheromone being evaluated.
+		
+		@rtype: bool
+		@return: True if the pheromone can be smelled.
+		"""
+		return self._isClear(pheromone.getPosition(), True)
+		
+	def _gatherAgents(self):
+		"""
+		Collects every agent of interest within sight, without regard for walls.
+		
+		@rtype: list
+		@return: (rank, agent) pairs for the agents found, in no particular
+		    order. Ranks are distances, except when sight is 1, in which case
+		    they follow the order of the spaces in sight.
+		"""
+		types = self._agent_types
+		if self._sight == 1: #It's probably always faster to perform the per-agent check in all other cases.
+			agents = []
+			for space in self._field.getSpacesInSight(self._position, 1):
+				agents += space.getAgents(types)
+			return zip(range(len(agents)), agents)
+			
+		if not self._field.countAgents(self._position, self._sight + 1, types):
+			return []
+			
+		agents = []
+		for agent in shared.AGENTS:
+			if not agent is self._observer:
+				if types and type(agent) not in types:
+					continue
+					
+				distance = map.calcDistance(self._position, agent.getPosition())
+				if self._sight >= distance:
+					agents.append((distance, agent))
+		return agents
+		
+	def _getPheromoneKeys(self, types=None, colony=None):
+		"""
+		Lists the partitions of the field's pheromones that are of interest and
+		match the specified criteria. Pheromones associated with threats match
+		every colony.
+		
+		@type types: sequence
+		@param types: The types of pheromone of interest, or None if all are.
+		@type colony: colony.Colony
+		@param colony: The colony whose pheromones are of interest, or None if
+		    all colonies' are.
+		
+		@rtype: list
+		@return: The (type, colony) of each matching partition.
+		"""
+		keys = self._field.getPheromoneKeys(types, colony)
+		if self._pheromone_types:
+			keys = [key for key in keys if key[0] in self._pheromone_types]
+		return keys
+		
+	def _isClear(self, position, pheromone):
+		"""
+		Indicates whether the path from the observer to a position is clear.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates being evaluated.
+		@type pheromone: bool
+		@param pheromone: True if sponges should be considered walls.
+		
+		@rtype: bool
+		@return: True if the path is clear.
+		"""
+		return self._field.isPathClear(self._position, position, pheromone)
+		
+	def _matchAgents(self, types=None, colony=None, invert_colony=False, predicate=None):
+		"""
+		Filters the agents within sight, without regard for walls.
+		
+		@type types: sequence
+		@param types: The types of agent to be kept, or None if all are valid.
+		@type colony: colony.Colony
+		@param colony: The colony whose agents should be kept, or None if all
+		    colonies are valid.
+		@type invert_colony: bool
+		@param invert_colony: True if all colonies other than the one specified
+		    should be kept.
+		@type predicate: callable
+		@param predicate: A function that must return True for an agent to be
+		    kept, or None if all agents are acceptable.
+		
+		@rtype: list
+		@return: A new list of (rank, agent) pairs for the agents kept.
+		"""
+		if self._agents is None:
+			self._agents = self._gatherAgents()
+			
+		agents = self._agents[:]
+		if types:
+			agents = [(rank, agent) for (rank, agent) in agents if type(agent) in types]
+		if colony:
+			if invert_colony:
+				agents = [(rank, agent) for (rank, agent) in agents if not agent.getColony() is colony]
+			else:
+				agents = [(rank, agent) for (rank, agent) in agents if agent.getColony() is colony]
+		if predicate:
+			agents = [(rank, agent) for (rank, agent) in agents if predicate(agent)]
+		return agents
+		
+	def _matchPheromones(self, types=None, colony=None, predicate=None):
+		"""
+		Filters the pheromones that can be smelled, without regard for walls or
+		sponges. Pheromones associated with threats match every colony.
+		
+		@type types: sequence
+		@param types: The types of pheromone to be kept, or None if all are
+		    valid.
+		@type colony: colony.Colony
+		@param colony: The colony whose pheromones should be kept, or None if
+		    all colonies are valid.
+		@type predicate: callable
+		@param predicate: A function that must return True for a pheromone to be
+		    kept, or None if all pheromones are acceptable.
+		
+		@rtype: list
+		@return: A new list of (intensity, pheromone) pairs for the pheromones
+		    kept.
+		"""
+		pheromones = []
+		for key in self._getPheromoneKeys(types, colony):
+			pheromones += self._field.smellPartition(self._position, self._smell, key)
+		if predicate:
+			pheromones = [(intensity, pheromone) for (intensity, pheromone) in pheromones if predicate(pheromone)]
+		return pheromones
+		
+		
 class Agent(shared.Traceable, breve.Stationary):
 	"""
 	An abstract superclass for any agent that can affect the system in some way.
@@ -18,9 +365,10 @@ class Agent(shared.Traceable, breve.Stationary):
 	_life = None #: The number of ticks left in this agent's life.
 	_sight = None #: Non-pheromone entities can be detected within this radius.
 	_smell = None #: Pheromone entities are considered this much closer for inverse-square calculations.
-	_orientation = None #: The direction this agent is facing.
+	_direction = None #: The index, in map.DIRECTIONS, of the direction this agent is facing.
 	_status = STATUS_WANDERING #: The current behaviour of this agent.
 	_target = None #: The shared.Traceable that this agent is following, if status is STATUS_FOLLOWING.
+	_random = None #: The shared.RandomStream from which this agent draws all of its random values.
 	
 	def __init__(self):
 		"""
@@ -31,20 +379,24 @@ class Agent(shared.Traceable, breve.Stationary):
 		"""
 		raise Exception("Unable to instantiate Agent.")
 		
-	def _init(self, config_data):
+	def _init(self, config_data, stream):
 		"""
 		Sets up Agent properties.
 		
 		@type config_data: dict
 		@param config_data: The data used to initialize an agent.
+		@type stream: shared.RandomStream
+		@param stream: The random stream that belongs to this agent.
 		"""
+		self._random = stream
 		self._life = config_data.get('lifespan')
 		self._sight = config_data.get('sight') or 1
 		self._smell = config_data.get('smell') or 1
-		self._orientation = RANDOMIZER.choice(range(0, 360, 45))
+		self._direction = stream.choice(map.DIRECTIONS)
 		
 		if not type(self) is Builder:
 			shared.AGENTS.append(self)
+			shared.CENSUS.add(self, self._status)
 			
 	def act(self, old_field, new_field):
 		"""
@@ -77,6 +429,11 @@ class Agent(shared.Traceable, breve.Stationary):
 		objectsInLoS() to check for agents instead. (It's basically just changing
 		'object' into 'agent')
 		
+		Note:: Before scanning every agent, the field's occupancy counts are
+		checked for anything that could be in range, allowing one space of
+		slack for agents that have moved since the field was built. The unts
+		leaving each hill are counted into the field as they are dispatched.
+		
 		@type field: map.Field
 		@param field: The state-field from which information about the environment
 		    will be read.
@@ -94,29 +451,84 @@ class Agent(shared.Traceable, breve.Stationary):
 		@return: A list of all agents that can be seen, in order of increasing
 		    distance.
 		"""
-		agents = []
-		if self._sight == 1: #It's probably always faster to perform the per-agent check in all other cases.
-			for space in field.getSpacesInSight(self._position, self._sight):
-				agents += space.getAgents(types, colony)
-		else:
-			for agent in shared.AGENTS:
-				if not agent is self:
-					if types and type(agent) not in types:
-						continue
-					if colony:
-						if invert_colony and agent.getColony() is colony:
-							continue
-						elif not invert_colony and not agent.getColony() is colony:
-							continue
-							
-					agent_position = agent.getPosition()
-					distance = map.calcDistance(self._position, agent_position)
-					if self._sight >= distance and field.clearPath(self._position, agent_position, False)[0]:
-						agents.append((distance, agent))
-			if agents:
-				agents.sort()
-				agents = [agent for (distance, agent) in agents]
-		return agents
+		return self.perceive(field, types).getAgents(None, colony, invert_colony)
+		
+	def anyAgent(self, field, types=None, colony=None, invert_colony=False, predicate=None):
+		"""
+		Indicates whether this agent can see any agent that matches the
+		specified criteria, without ordering the candidates.
+		
+		@type field: map.Field
+		@param field: The state-field from which information about the environment
+		    will be read.
+		@type types: sequence
+		@param types: A filter that will be applied to limit the agents
+		    considered. All agents will be considered if not specified.
+		@type colony: colony.Colony
+		@param colony: A filter that will be applied to limit the agents
+		    considered. All agents will be considered if not specified.
+		@type invert_colony: bool
+		@param invert_colony: True if all colonies other than the one specified
+		    should be considered.
+		@type predicate: callable
+		@param predicate: A function that must return True for an agent to be
+		    considered, or None if all agents are acceptable.
+		
+		@rtype: bool
+		@return: True if a matching agent can be seen.
+		"""
+		return self.perceive(field, types).hasAgent(None, colony, invert_colony, predicate)
+		
+	def bestPheromone(self, field, types=None, colony=None, predicate=None):
+		"""
+		Finds the pheromone with the greatest perceived intensity that this agent
+		can smell; this is the first entry pheromonesByStrength() would return,
+		found without ordering the candidates.
+		
+		@type field: map.Field
+		@param field: The state-field from which information about the environment
+		    will be read.
+		@type types: sequence
+		@param types: A filter that will be applied to limit the pheromones
+		    considered. All pheromones will be considered if not specified.
+		@type colony: colony.Colony
+		@param colony: A filter that will be applied to limit the pheromones
+		    considered. All pheromones will be considered if not specified.
+		@type predicate: callable
+		@param predicate: A function that must return True for a pheromone to be
+		    considered, or None if all pheromones are acceptable.
+		
+		@rtype: inerts.Pheromone
+		@return: The strongest matching pheromone, or None if nothing can be
+		    smelled.
+		"""
+		return self.perceive(field, None, types).getStrongestPheromone(None, colony, predicate)
+		
+	def nearestAgent(self, field, types=None, colony=None, invert_colony=False, predicate=None):
+		"""
+		Finds the nearest agent that this agent can see; this is the first entry
+		agentsInLoS() would return, found without ordering the candidates.
+		
+		@type field: map.Field
+		@param field: The state-field from which information about the environment
+		    will be read.
+		@type types: sequence
+		@param types: A filter that will be applied to limit the agents
+		    considered. All agents will be considered if not specified.
+		@type colony: colony.Colony
+		@param colony: A filter that will be applied to limit the agents
+		    considered. All agents will be considered if not specified.
+		@type invert_colony: bool
+		@param invert_colony: True if all colonies other than the one specified
+		    should be considered.
+		@type predicate: callable
+		@param predicate: A function that must return True for an agent to be
+		    considered, or None if all agents are acceptable.
+		
+		@rtype: Agent
+		@return: The nearest matching agent, or None if nothing can be seen.
+		"""
+		return self.perceive(field, types).getNearestAgent(None, colony, invert_colony, predicate)
 		
 	def objectsInLoS(self, field, types=None, colony=None):
 		"""
@@ -136,10 +548,35 @@ class Agent(shared.Traceable, breve.Stationary):
 		@return: A list of all objects that can be seen, in order of increasing
 		    distance.
 		"""
-		objects = []
-		for space in field.getSpacesInSight(self._position, self._sight):
-			objects += space.getObjects(types, colony)
-		return objects
+		key = ('objects', self._position, self._sight, types, colony)
+		objects = field.recallQuery(key)
+		if objects is None:
+			objects = []
+			for space in field.getSpacesInSight(self._position, self._sight):
+				objects += space.getObjects(types, colony)
+			field.rememberQuery(key, objects)
+		return objects[:]
+		
+	def perceive(self, field, agent_types=None, pheromone_types=None):
+		"""
+		Gathers everything of interest that this agent can see and smell, so
+		that several decisions can be made without repeating the search.
+		
+		@type field: map.Field
+		@param field: The state-field from which information about the environment
+		    will be read.
+		@type agent_types: sequence
+		@param agent_types: The types of agent that may be of interest. All
+		    agents will be gathered if not specified.
+		@type pheromone_types: sequence
+		@param pheromone_types: The types of pheromone that may be of interest.
+		    All pheromones will be gathered if not specified.
+		
+		@rtype: Perception
+		@return: The agents and pheromones that can be sensed. Each is gathered
+		    only when first needed.
+		"""
+		return Perception(field, self, self._position, self._sight, self._smell, agent_types, pheromone_types)
 		
 	def pheromonesByStrength(self, field, types=None, colony=None):
 		"""
@@ -159,26 +596,7 @@ class Agent(shared.Traceable, breve.Stationary):
 		@return: A list of all pheromones that can be sensed, in order of
 		    decreasing perceived intensity.
 		"""
-		pheromones = []
-		
-		for pheromone in field.getPheromones():
-			if types and pheromone.getType() not in types:
-				continue
-			pheromone_colony = pheromone.getColony()
-			if colony and pheromone_colony and not pheromone_colony is colony:
-				continue
-				
-			pheromone_position = pheromone.getPosition()
-			distance = map.calcDistance(self._position, pheromone_position)
-			intensity = map.calcInverseSquare(distance, self._smell, pheromone.getIntensity())
-			if intensity > 1 and field.clearPath(self._position, pheromone_position, True)[0]:
-				pheromones.append((intensity, pheromone))
-		if pheromones:
-			pheromones.sort()
-			pheromones = [pheromone for (intensity, pheromone) in pheromones]
-			pheromones.reverse()
-			
-		return pheromones
+		return self.perceive(field, None, types).getPheromones(None, colony)
 		
 	def canSense(self, target, field):
 		"""
@@ -212,7 +630,7 @@ class Agent(shared.Traceable, breve.Stationary):
 		else:
 			if map.calcDistance(self._position, position) > self._sight:
 				return False
-		return field.clearPath(self._position, position, pheromone)[0]
+		return field.isPathClear(self._position, position, pheromone)
 		
 	def die(self):
 		"""
@@ -223,12 +641,16 @@ class Agent(shared.Traceable, breve.Stationary):
 		self._alive = False
 		if not type(self) is Builder:
 			shared.AGENTS.remove(self)
+			shared.CENSUS.remove(self, self._status)
 			
 	def getOrientation(self):
 		"""
 		Returns the angle this agent is facing.
+		
+		Note:: Headings are stored as one of eight directions; this is a
+		convenience for code that works in terms of angles.
 		"""
-		return self._orientation
+		return self._direction * 45
 		
 	def isAlive(self):
 		"""
@@ -258,8 +680,11 @@ class Agent(shared.Traceable, breve.Stationary):
 	def setOrientation(self, orientation):
 		"""
 		Causes this agent to face the newly specified direction.
+		
+		Note:: The angle is snapped to the nearest of the eight directions in
+		which this agent can travel. Fractional angles are rounded up first.
 		"""
-		self._orientation = orientation % 360
+		self._direction = map.ANGLE_DIRECTIONS[int(math.ceil(orientation)) % 360]
 		
 	def tick(self):
 		"""
@@ -279,6 +704,9 @@ class Agent(shared.Traceable, breve.Stationary):
 		Causes this agent to try to take a step forward. If the path is blocked,
 		then a wall was enountered.
 		
+		Walls are looked up in shared.TERRAIN's grid when it has been built, so
+		a step costs a single array lookup and no space is created for it.
+		
 		@type field: map.Field
 		@param field: The state-field from which information about the
 		    environment will be read.
@@ -286,12 +714,18 @@ class Agent(shared.Traceable, breve.Stationary):
 		@rtype: bool
 		@return: True if the agent successfully advanced.
 		"""
-		target_space = field.getSpace(map.nextPositionByAngle(self._position, self._orientation))
-		if not target_space or target_space.getObjects((inerts.Wall,)):
-			#The edge of the map would be passed; treat this as a wall.
-			return False
-			
-		self._position = (x, y) = target_space.getPosition()
+		position = map.nextPositionByDirection(self._position, self._direction)
+		if shared.TERRAIN:
+			if not shared.TERRAIN.isOpen(position):
+				#Walls and the edge of the map block movement alike.
+				return False
+		else:
+			target_space = field.getSpace(position)
+			if not target_space or target_space.getObjects((inerts.Wall,)):
+				#The edge of the map would be passed; treat this as a wall.
+				return False
+				
+		self._position = (x, y) = position
 		self.move(breve.vector(x, y, 0))
 		return True #Movement succeeded.
 		
@@ -306,7 +740,7 @@ class Agent(shared.Traceable, breve.Stationary):
 		@rtype: number
 		@return: The angle that this agent would need to turn to face the goal.
 		"""
-		angle = (map.findAngle(self._position, goal) - self._orientation) % 360
+		angle = (map.findAngle(self._position, goal) - self._direction * 45) % 360
 		if angle >= 180:
 			return 360 - angle
 		return angle
@@ -320,9 +754,20 @@ class Agent(shared.Traceable, breve.Stationary):
 		
 		@return: Nothing.
 		"""
-		self._status = STATUS_FOLLOWING
+		self._setStatus(STATUS_FOLLOWING)
 		self._target = target
-		self.setOrientation(map.findAngle(self._position, target.getPosition()))
+		self._face(target.getPosition())
+		
+	def _face(self, goal):
+		"""
+		Causes this agent to face the specified position.
+		
+		@type goal: tuple
+		@param goal: The (x, y) co-ordinates to be faced.
+		
+		@return: Nothing.
+		"""
+		self._direction = map.findDirection(self._position, goal)
 		
 	def _move(self, old_field, new_field):
 		"""
@@ -361,10 +806,10 @@ class Agent(shared.Traceable, breve.Stationary):
 		@return: Nothing.
 		"""
 		if self.canSense(self._target, field):
-			self.setOrientation(map.findAngle(self.getPosition(), self._target.getPosition()))
+			self._face(self._target.getPosition())
 			
 		if not self._advance(field): #The next space is inaccessible.
-			self.setOrientation(self.getOrientation() + RANDOMIZER.choice((-90, -45, 45, 90)))
+			self._turn(self._random.choice((-2, -1, 1, 2)))
 			self._advance(field) #Try again before waiting until the next cycle.
 			
 	def _moveFollowPheromone(self, old_field, new_field):
@@ -384,16 +829,16 @@ class Agent(shared.Traceable, breve.Stationary):
 		"""
 		if self._position == self._target.getPosition(): #Destination reached.
 			if self._status == STATUS_TRACING:
-				self._status = STATUS_RETURNING
+				self._setStatus(STATUS_RETURNING)
 			else:
-				self._status = STATUS_WANDERING
+				self._setStatus(STATUS_WANDERING)
 		else: #Adjust orientation and advance.
-			self.setOrientation(map.findAngle(self.getPosition(), self._target.getPosition()))
+			self._face(self._target.getPosition())
 			if not self._advance(new_field): #The next space is inaccessible.
 				#Look for the next-best signal in LoS.
-				signals = self.pheromonesByStrength(old_field, (self._target.getType(),), self._target.getColony())
-				if signals:
-					self._follow(signals[0])
+				signal = self.bestPheromone(old_field, (self._target.getType(),), self._target.getColony())
+				if signal:
+					self._follow(signal)
 					self._advance(new_field) #Try again before waiting until the next cycle.
 					
 	def _moveReturn(self, old_field, new_field):
@@ -416,7 +861,7 @@ class Agent(shared.Traceable, breve.Stationary):
 		if self._status == STATUS_DETOURING:
 			nearest_hill = self.locateNearestHill()
 			if new_field.clearPath(self.getPosition(), nearest_hill.getPosition()):
-				self.setOrientation(map.findAngle(self.getPosition(), nearest_hill.getPosition()))
+				self._face(nearest_hill.getPosition())
 			else: #Look for signals that suggest nearby paths.
 				signals = [pheromone for pheromone in self.pheromonesByStrength((RESOURCE_FOOD, RESOURCE_WATER), self.getColony()) if -90 < self._angleOffset(pheromone.getPosition()) < 90]
 				if signals:
@@ -424,8 +869,8 @@ class Agent(shared.Traceable, breve.Stationary):
 		elif self._status == STATUS_BACKTRACKING:
 			spaces = [space for space in new_field.getSpace(self._position).getMoore() if space.isOpen() and angleOffest(self, space.getPosition()) not in (0, 180)]
 			if spaces: #It's possible to change course, so do it.
-				self.setOrientation(map.findAngle(self._position, RANDOMIZER.choice(spaces).getPosition()))
-				self._status = STATUS_DETOURING
+				self._face(self._random.choice(spaces).getPosition())
+				self._setStatus(STATUS_DETOURING)
 				
 		if not self._advance(new_field):
 			self._moveReturnWall(new_field)
@@ -449,11 +894,11 @@ class Agent(shared.Traceable, breve.Stationary):
 		if not fork_paths: #Try any path that doesn't involve going backwards. 
 			fork_paths = [space for space in open_spaces if not self._angleOffset(space.getPosition()) == 180]
 		if fork_paths:
-			self.setOrientation(map.findAngle(self._position, RANDOMIZER.choice(fork_paths).getPosition()))
-			self._status = STATUS_DETOURING
+			self._face(self._random.choice(fork_paths).getPosition())
+			self._setStatus(STATUS_DETOURING)
 		else: #This is a dead end.
-			self.setOrientation(self._orientation + 180)
-			self._status = STATUS_BACKTRACKING
+			self._turn(4)
+			self._setStatus(STATUS_BACKTRACKING)
 			
 	def _moveWall(self, field, paths):
 		"""
@@ -468,29 +913,57 @@ class Agent(shared.Traceable, breve.Stationary):
 		@return: Nothing.
 		"""
 		if paths:
-			self.setOrientation(map.findAngle(self._position, RANDOMIZER.choice(paths).getPosition()))
+			self._face(self._random.choice(paths).getPosition())
 		else:
-			self.setOrientation(self._orientation + 180)
+			self._turn(4)
 			
 	def _moveWander(self, field):
 		"""
 		Causes this agent to proceed with a wandering streategy, handling
 		wall-based pathfinding is necessary.
 		
+		The step is taken during this agent's own act(), so agents later in the
+		turn order already see it in the new field.
+		
 		@type field: map.Field
 		@param field: The state-field from which information about the
 		    environment will be read.
 		
 		@return: Nothing.
 		"""
-		if RANDOMIZER.random() < ENVIRONMENT.WANDER_VARIANCE:
-			self.setOrientation(self._orientation + RANDOMIZER.choice((-45, 45)))
+		if self._random.random() < ENVIRONMENT.WANDER_VARIANCE:
+			self._turn(self._random.choice((-1, 1)))
 			
 		if not self._advance(field): #Handle with wall-collision logic.
 			paths = [space for space in field.getSpace(self.getPosition()).getMoore() if space.isOpen()]
 			self._moveWall(field, paths)
 			
+	def _setStatus(self, status):
+		"""
+		Changes this agent's behaviour, keeping shared.CENSUS up to date.
+		
+		@type status: int
+		@param status: A status enumeration constant.
+		
+		@return: Nothing.
+		"""
+		if not status == self._status:
+			shared.CENSUS.move(self, self._status, status)
+			self._status = status
 			
+	def _turn(self, steps):
+		"""
+		Causes this agent to turn clockwise by the specified number of 45-degree
+		steps; negative values turn it counter-clockwise.
+		
+		@type steps: int
+		@param steps: The number of steps to turn.
+		
+		@return: Nothing.
+		"""
+		self._direction = (self._direction + steps) % 8
+		
+		
 class Threat(Agent):
 	"""
 	Threats exist solely to make life miserable for unts. They eat them and reproduce.
@@ -509,7 +982,7 @@ class Threat(Agent):
 		"""
 		raise Exception("Unable to instantiate Threat.")
 		
-	def _init(self, config_data, position):
+	def _init(self, config_data, position, stream):
 		"""
 		Sets up Threat properties.
 		
@@ -518,8 +991,11 @@ class Threat(Agent):
 		    threat.
 		@type position: tuple
 		@param position: The (x, y) co-ordinates of this threat.
+		@type stream: shared.RandomStream
+		@param stream: The random stream that belongs to this threat, or None if
+		    one should be derived from the system's generator.
 		"""
-		Agent._init(self, config_data)
+		Agent._init(self, config_data, stream or RANDOMIZER.substream())
 		shared.Traceable._init(self, position)
 		
 		self._health_points = config_data.get('health_points')
@@ -536,29 +1012,30 @@ class Threat(Agent):
 		if self._status == STATUS_KILLING:
 			self._cooldown -= 1
 			if not self._cooldown:
-				self._status = STATUS_RETREATING
+				self._setStatus(STATUS_RETREATING)
 			else: #Hold position.
 				return
 				
-		if RANDOMIZER.random() < ENVIRONMENT.DECISION_FREQUENCY:
+		if self._random.random() < ENVIRONMENT.DECISION_FREQUENCY:
 			if self._status == STATUS_WANDERING:
 				prey = self.agentsInLoS(old_field, (Architect, Warrior, Worker))
 				if len(prey) == 1 or (len(prey) > 1 and not [agent for agent in prey if type(agent) is Warrior]):
 					self._follow(prey[0])
 			elif self._status == STATUS_FOLLOWING:
 				if not old_field.exists(self._target):
-					self._status = STATUS_WANDERING
+					self._setStatus(STATUS_WANDERING)
 				else:
-					threats = self.agentsInLoS(old_field, (Warrior,))
-					if self._health_points == 1 or len(threats) > 1 or (len(threats) == 1 and not self._target in threats):
-						self._status = STATUS_WANDERING
+					target = self._target
+					if self._health_points == 1 or self.anyAgent(old_field, (Warrior,), predicate=lambda agent: not agent is target):
+						self._setStatus(STATUS_WANDERING)
 			elif self._status == STATUS_RETREATING:
-				if not self.pheromonesByStrength(old_field, (SIGNAL_THREAT,)):
-					self._status = STATUS_WANDERING
+				if not self.bestPheromone(old_field, (SIGNAL_THREAT,)):
+					self._setStatus(STATUS_WANDERING)
 				else:
-					threats = self.agentsInLoS(old_field, (Warrior,))
-					if threats:
-						self.setOrientation(map.findAngle(self.getPosition(), threats[0].getPosition()) + 180)
+					threat = self.nearestAgent(old_field, (Warrior,))
+					if threat:
+						self._face(threat.getPosition())
+						self._turn(4)
 						
 		self._move(old_field, new_field)
 		
@@ -616,7 +1093,7 @@ class Threat(Agent):
 		@return: Nothing.
 		"""
 		for i in range(self._countChildren()):
-			THREATS.append(self.__class__(self.getPosition()))
+			THREATS.append(self.__class__(self.getPosition(), self._random.substream()))
 		self.die()
 		
 	def _attack(self, target, field):
@@ -642,7 +1119,7 @@ class Threat(Agent):
 			elif type(target) is Worker:
 				self._cooldown = ENVIRONMENT.KILL_TIME_WORKER
 			self._unts_consumed += 1
-		self._status = STATUS_KILLING
+		self._setStatus(STATUS_KILLING)
 		target.die(field)
 		
 	def _countChildren(self):
@@ -674,15 +1151,18 @@ class Predator(Threat):
 	"""
 	A predator is a threat that just wanders and kills.
 	"""
-	def __init__(self, position):
+	def __init__(self, position, stream=None):
 		"""
 		Creates a new Predator.
 		
 		@type position: tuple
 		@param position: The (x, y) co-ordinates of this threat.
+		@type stream: shared.RandomStream
+		@param stream: The random stream that belongs to this threat, or None if
+		    one should be derived from the system's generator.
 		"""
 		config_data = ENVIRONMENT.PREDATORS
-		Threat._init(self, config_data, position)
+		Threat._init(self, config_data, position, stream)
 		
 		
 class Hunter(Threat):
@@ -690,38 +1170,44 @@ class Hunter(Threat):
 	A hunter is a threat that deposits pheromones to lure workers towards its
 	location.
 	"""
-	def __init__(self, position):
+	def __init__(self, position, stream=None):
 		"""
 		Creates a new Hunter.
 		
 		@type position: tuple
 		@param position: The (x, y) co-ordinates of this threat.
+		@type stream: shared.RandomStream
+		@param stream: The random stream that belongs to this threat, or None if
+		    one should be derived from the system's generator.
 		"""
 		config_data = ENVIRONMENT.HUNTERS
-		Threat._init(self, config_data, position)
+		Threat._init(self, config_data, position, stream)
 		
 	def _speciesAction(self, old_field, new_field):
-		new_field.getSpace(self._position).addPheromone(RANDOMIZER.choice((RESOURCE_FOOD, RESOURCE_WATER)), None, ENVIRONMENT.HUNTERS['pheromones'])
+		new_field.getSpace(self._position).addPheromone(self._random.choice((RESOURCE_FOOD, RESOURCE_WATER)), None, ENVIRONMENT.HUNTERS['pheromones'])
 		
 		
 class Stalker(Threat): #STALKER!
 	"""
 	A stalker is a threat that follows pheromones to find workers.
 	"""
-	def __init__(self, position):
+	def __init__(self, position, stream=None):
 		"""
 		Creates a new Stalker.
 		
 		@type position: tuple
 		@param position: The (x, y) co-ordinates of this threat.
+		@type stream: shared.RandomStream
+		@param stream: The random stream that belongs to this threat, or None if
+		    one should be derived from the system's generator.
 		"""
 		config_data = ENVIRONMENT.STALKERS
-		Threat._init(self, config_data, position)
+		Threat._init(self, config_data, position, stream)
 		
 	def _speciesAction(self, old_field, new_field):
-		leads = self.pheromonesByStrength(old_field, (RESOURCE_FOOD, RESOURCE_WATER))
-		if leads:
-			self._follow(leads[0])
+		lead = self.bestPheromone(old_field, (RESOURCE_FOOD, RESOURCE_WATER))
+		if lead:
+			self._follow(lead)
 			
 			
 class Unt(Agent):
@@ -755,7 +1241,7 @@ class Unt(Agent):
 		@param hill: The hill to which this unt is attached.
 		"""
 		config_data['lifespan'] = ENVIRONMENT.REPRODUCTION + hill.getColony().LIFESPAN
-		Agent._init(self, config_data)
+		Agent._init(self, config_data, hill.spawnStream())
 		shared.Traceable._init(self, hill.getPosition())
 		
 		self._energy = self._max_energy = config_data.get('energy')
@@ -785,6 +1271,7 @@ class Unt(Agent):
 				colony = self.getColony()
 				field.getSpace(self._position).addPheromone(SIGNAL_THREAT, colony, colony.PHEROMONES_ATTACK)
 			self._hill.removeUnt(self, killed)
+			shared.UNTS.remove(self)
 			self.erase()
 			
 	def erase(self):
@@ -864,10 +1351,29 @@ class Unt(Agent):
 		@rtype: inerts.Hill
 		@return: The closest hill.
 		"""
-		space = field.getSpace(self._position)
-		hills = [(space.calcDistance(hill.getPosition()), hill) for hill in self.getColony().getHills()]
-		hills.sort()
-		return hills[0][1]
+		return self.getColony().getNearestHill(self._position)
+		
+	def locateResource(self, field, types):
+		"""
+		Finds the resource that this unt sees first, through shared.TERRAIN's
+		precomputed map if ENVIRONMENT.RESOURCE_MAP is set.
+		
+		@type field: map.Field
+		@param field: The state-field from which information about the
+		    environment will be read.
+		@type types: sequence
+		@param types: The inerts.Resource subclasses being sought.
+		
+		@rtype: inerts.Resource
+		@return: The first resource that can be seen, or None if there is none.
+		"""
+		if ENVIRONMENT.RESOURCE_MAP and shared.TERRAIN:
+			return shared.TERRAIN.findResource(self._position, self._sight, types)
+			
+		resources = self.objectsInLoS(field, types)
+		if resources:
+			return resources[0]
+		return None
 		
 	def objectsInLoS(self, field, types=None, colony=None):
 		if colony is self.getColony() and types == (inerts.Hill,):
@@ -1037,11 +1543,12 @@ class Architect(BreveUnt):
 			
 		BreveUnt._init(self, config_data)
 		self.show()
+		shared.UNTS.add(self)
 		
 	def _act(self, old_field, new_field):
 		self._move(old_field, new_field)
 		
-		if not [hill for hill in self.getColony().getHills() if map.calcDistance(self.getPosition(), hill.getPosition()) < ENVIRONMENT.MIN_BUILD_DISTANCE]:
+		if not self.getColony().getNearestHillDistance(self._position) < ENVIRONMENT.MIN_BUILD_DISTANCE:
 			if self._role == RESOURCE_FOOD:
 				self._scoutHill(old_field, new_field, (inerts.Food,))
 			elif self._role == RESOURCE_WATER:
@@ -1084,7 +1591,7 @@ class Architect(BreveUnt):
 		
 		@return: Nothing.
 		"""
-		if self.objectsInLoS(old_field, types):
+		if self.locateResource(old_field, types):
 			self._buildHill(new_field)
 			self.die()
 			
@@ -1105,10 +1612,20 @@ class FieldUnt(BreveUnt):
 		"""
 		raise Exception("Unable to instantiate FieldUnt.")
 		
+	def _init(self, config_data):
+		"""
+		Sets up FieldUnt properties.
+		
+		@type config_data: dict
+		@param config_data: A collection of variables needed to initialise this
+		    unt.
+		"""
+		BreveUnt._init(self, config_data)
+		self._hill.restUnt(self)
+		
 	def act(self, old_field, new_field):
 		if self._resting:
 			self.dispatch()
-			new_field.getSpace(self._position).addAgent(self)
 		else:
 			if not self._returning and float(self._energy - 1) / self._max_energy <= 0.5: #Need to recover.
 				self._follow(self.locateNearestHill(new_field))
@@ -1127,6 +1644,8 @@ class FieldUnt(BreveUnt):
 		self._setHill(hill)
 		self._resting = True
 		self._returning = False
+		hill.restUnt(self)
+		shared.UNTS.remove(self)
 		self.hide()
 		
 	def dispatch(self):
@@ -1135,11 +1654,12 @@ class FieldUnt(BreveUnt):
 		
 		@return: Nothing.
 		"""
-		self._status = STATUS_WANDERING
-		self._orientation = RANDOMIZER.randint(0, 359)
+		self._setStatus(STATUS_WANDERING)
+		self._direction = self._random.choice(map.DIRECTIONS)
 		self._resting = False
 		self._recoverEnergy()
 		self.show()
+		shared.UNTS.add(self)
 		
 	def isResting(self):
 		"""
@@ -1163,11 +1683,39 @@ class FieldUnt(BreveUnt):
 		return not self._resting and Agent.isVisible(self)
 		
 	def _move(self, old_field, new_field):
-		if self._returning and type(self._target) is inerts.Hill and self._position == self._target.getPosition():
-			self.arrive(self._target)
+		if self._returning and type(self._target) is inerts.Hill:
+			if self._position == self._target.getPosition():
+				self.arrive(self._target)
+			else:
+				self._moveHome(old_field, new_field)
 		else:
 			Agent._move(self, old_field, new_field)
 			
+	def _moveHome(self, old_field, new_field):
+		"""
+		Causes this unt to step towards the nearest hill by the shortest route
+		around walls, heading straight for its target whenever that is just as
+		quick.
+		
+		@type old_field: map.Field
+		@param old_field: The state-field from which information about the
+		    environment will be read.
+		@type new_field: map.Field
+		@param new_field: The state-field to which this agent's information will
+		    be written.
+		
+		@return: Nothing.
+		"""
+		colony = self.getColony()
+		direction = colony.getHomingDirection(self._position, map.findDirection(self._position, self._target.getPosition()))
+		if direction is None: #No route is known, so head straight for the hill.
+			Agent._move(self, old_field, new_field)
+			return
+			
+		self._direction = direction
+		if self._advance(new_field) and not colony.getNearestHillDistance(self._position):
+			self._target = colony.getNearestHill(self._position) #The route led to a different hill.
+			
 			
 class Warrior(FieldUnt):
 	"""
@@ -1185,14 +1733,14 @@ class Warrior(FieldUnt):
 		config_data = hill.getColony().WARRIORS
 		Unt._init(self, config_data, hill)
 		
-		self._escort = RANDOMIZER.random() < config_data.get('escort')
+		self._escort = self._random.random() < config_data.get('escort')
 		
-		BreveUnt._init(self, config_data)
+		FieldUnt._init(self, config_data)
 		
 	def _act(self, old_field, new_field):
-		if RANDOMIZER.random() < ENVIRONMENT.DECISION_FREQUENCY:
+		if self._random.random() < ENVIRONMENT.DECISION_FREQUENCY:
 			if self._status == STATUS_FOLLOWING and not old_field.exists(self._target):
-				self._status = STATUS_WANDERING
+				self._setStatus(STATUS_WANDERING)
 				
 			if self._status == STATUS_WANDERING or (self._status == STATUS_FOLLOWING and not type(self._target) is inerts.Hill):
 				self._determineNewStatus(old_field)
@@ -1238,22 +1786,27 @@ class Warrior(FieldUnt):
 		
 		@return: Nothing.
 		"""
-		threats = [agent for agent in self.agentsInLoS(field, (Warrior, Predator, Hunter, Stalker)) if self.isThreat(agent)]
-		if threats:
-			self._follow(threats[0])
+		if self._escort:
+			perception = self.perceive(field, (Warrior, Predator, Hunter, Stalker, Worker, Architect), (SIGNAL_THREAT, RESOURCE_FOOD, RESOURCE_WATER))
 		else:
-			threat_signals = self.pheromonesByStrength(field, (SIGNAL_THREAT,))
-			if threat_signals:
-				self._follow(threat_signals[0])
+			perception = self.perceive(field, (Warrior, Predator, Hunter, Stalker, Worker, Architect), (SIGNAL_THREAT,))
+			
+		threat = perception.getNearestAgent((Warrior, Predator, Hunter, Stalker), predicate=self.isThreat)
+		if threat:
+			self._follow(threat)
+		else:
+			threat_signal = perception.getStrongestPheromone((SIGNAL_THREAT,))
+			if threat_signal:
+				self._follow(threat_signal)
 			else:
-				foreigners = [agent for agent in self.agentsInLoS(field, (Worker, Architect), self.getColony(), True)]
-				if foreigners: #See if there's a foreign worker nearby, and kill it if possible.
-					self._follow(foreigners[0])
+				foreigner = perception.getNearestAgent((Worker, Architect), self.getColony(), True)
+				if foreigner: #See if there's a foreign worker nearby, and kill it if possible.
+					self._follow(foreigner)
 				else:
 					if self._escort:
-						signals = self.pheromonesByStrength(field, (RESOURCE_FOOD, RESOURCE_WATER))
-						if signals:
-							self._follow(signals[0])
+						signal = perception.getStrongestPheromone((RESOURCE_FOOD, RESOURCE_WATER))
+						if signal:
+							self._follow(signal)
 							
 							
 class Worker(FieldUnt):
@@ -1279,11 +1832,11 @@ class Worker(FieldUnt):
 		Unt._init(self, config_data, hill)
 		self._boldness = config_data.get('boldness')
 		self._carrying_capacity = config_data.get('carrying_capacity')
-		self._stochastic = RANDOMIZER.random() < config_data.get('stochastic_probaility')
+		self._stochastic = self._random.random() < config_data.get('stochastic_probaility')
 		
 		self._avoid = []
 		
-		BreveUnt._init(self, config_data)
+		FieldUnt._init(self, config_data)
 		
 	def arrive(self, hill):
 		hill.addResource(self._payload)
@@ -1297,7 +1850,7 @@ class Worker(FieldUnt):
 		risk_water = colony.getRiskWater()
 		
 		if risk_food <= 0 and risk_water <= 0:
-			if RANDOMIZER.random() < colony.WORKERS['no_focus']:
+			if self._random.random() < colony.WORKERS['no_focus']:
 				self._role = None
 			else:
 				element_3 = None
@@ -1307,27 +1860,27 @@ class Worker(FieldUnt):
 					element_3 = RESOURCE_FOOD
 				elif colony_water < colony_food:
 					element_3 = RESOURCE_WATER
-				self._role = RANDOMIZER.choice((RESOURCE_FOOD, RESOURCE_WATER, element_3))
+				self._role = self._random.choice((RESOURCE_FOOD, RESOURCE_WATER, element_3))
 		elif risk_food > 0 and risk_water > 0:
-			if RANDOMIZER.random() < float(risk_food) / (risk_food + risk_water):
+			if self._random.random() < float(risk_food) / (risk_food + risk_water):
 				self._role = RESOURCE_FOOD
 			else:
 				self._role = RESOURCE_WATER
 		elif risk_food > 0:
-			if RANDOMIZER.random() < (risk_food / colony.getConsumptionFood()):
+			if self._random.random() < (risk_food / colony.getConsumptionFood()):
 				self._role = RESOURCE_FOOD
 			else:
-				self._role = RANDOMIZER.choice((RESOURCE_WATER, None))
+				self._role = self._random.choice((RESOURCE_WATER, None))
 		elif risk_water > 0:
-			if RANDOMIZER.random() < (risk_water / colony.getConsumptionWater()):
+			if self._random.random() < (risk_water / colony.getConsumptionWater()):
 				self._role = RESOURCE_WATER
 			else:
-				self._role = RANDOMIZER.choice((RESOURCE_FOOD, None))
+				self._role = self._random.choice((RESOURCE_FOOD, None))
 				
 		FieldUnt.dispatch(self)
 		
 	def _act(self, old_field, new_field):
-		if RANDOMIZER.random() < ENVIRONMENT.DECISION_FREQUENCY:
+		if self._random.random() < ENVIRONMENT.DECISION_FREQUENCY:
 			dead_avoidances = []
 			for avoid in self._avoid:
 				if not self.canSense(avoid, old_field):
@@ -1337,7 +1890,7 @@ class Worker(FieldUnt):
 			dead_avoidances = None
 			
 			if self._status == STATUS_FOLLOWING and not old_field.exists(self._target):
-				self._status = STATUS_WANDERING
+				self._setStatus(STATUS_WANDERING)
 				
 			if self._status == STATUS_WANDERING or (self._status == STATUS_FOLLOWING and type(self._target) is inerts.Pheromone):
 				self._determineNewStatus(old_field)
@@ -1371,35 +1924,46 @@ class Worker(FieldUnt):
 		@return: Nothing.
 		"""
 		suicide_run = False
-		threats = [agent for agent in self.agentsInLoS(field, (Warrior, Predator, Hunter, Stalker)) if self.isThreat(agent)]
-		if threats:
+		if self._stochastic:
+			perception = self.perceive(field, (Warrior, Predator, Hunter, Stalker), (SIGNAL_THREAT,))
+		elif self._role == RESOURCE_FOOD:
+			perception = self.perceive(field, (Warrior, Predator, Hunter, Stalker), (SIGNAL_THREAT, RESOURCE_FOOD))
+		elif self._role == RESOURCE_WATER:
+			perception = self.perceive(field, (Warrior, Predator, Hunter, Stalker), (SIGNAL_THREAT, RESOURCE_WATER))
+		else:
+			perception = self.perceive(field, (Warrior, Predator, Hunter, Stalker), (SIGNAL_THREAT, RESOURCE_FOOD, RESOURCE_WATER))
+			
+		threat = perception.getNearestAgent(predicate=self.isThreat)
+		if threat:
 			if self._boldness == BOLDNESS_AGGRESSIVE:
-				self._follow(threats[0])
+				self._follow(threat)
 				self._avoid = []
 				suicide_run = True
 			elif self._boldness == BOLDNESS_PASSIVE:
-				self._avoid.append(threats[0])
+				self._avoid.append(threat)
 				
 		if not suicide_run:
-			threat_signals = self.pheromonesByStrength(field, (SIGNAL_THREAT,))
-			if threat_signals:
-				self._avoid.append(threat_signals[0])
+			threat_signal = perception.getStrongestPheromone((SIGNAL_THREAT,))
+			if threat_signal:
+				self._avoid.append(threat_signal)
 				
 			if not self._stochastic:
 				if self._role == RESOURCE_FOOD:
-					self._reactToPheromone(field, (RESOURCE_FOOD,))
+					self._reactToPheromone(field, perception, (RESOURCE_FOOD,))
 				elif self._role == RESOURCE_WATER:
-					self._reactToPheromone(field, (RESOURCE_WATER,))
+					self._reactToPheromone(field, perception, (RESOURCE_WATER,))
 				else:
-					self._reactToPheromone(field, (RESOURCE_FOOD, RESOURCE_WATER))
+					self._reactToPheromone(field, perception, (RESOURCE_FOOD, RESOURCE_WATER))
 					
-	def _getStrongestResourceSignal(self, field, types):
+	def _getStrongestResourceSignal(self, field, perception, types):
 		"""
 		Looks for the strengest resource signal that this unt can sense and
 		returns it.
 		
 		@type field: inerts.Field
 		@param field: The field from which information will be read.
+		@type perception: Perception
+		@param perception: What this unt has sensed.
 		@type types: sequence
 		@param types: A list of pheromone types this unt will try to sense.
 		
@@ -1407,14 +1971,12 @@ class Worker(FieldUnt):
 		@return: The strongest pheromone that could be sensed or None if there are
 		    no sense-able pheromones.
 		"""
-		filtered_pheromones = []
-		for pheromone in self.pheromonesByStrength(field, types, self.getColony()):
-			angle = abs(map.findAngle(self._position, self.locateNearestHill(field).getPosition()) - map.findAngle(self._position, pheromone.getPosition()))
-			if angle > 90 and angle < 270:
-				filtered_pheromones.append(pheromone)
-		if filtered_pheromones:
-			return filtered_pheromones[0]
-		return None
+		position = self._position
+		hill_angle = map.findAngle(position, self.locateNearestHill(field).getPosition())
+		def leadsAway(pheromone):
+			angle = abs(hill_angle - map.findAngle(position, pheromone.getPosition()))
+			return angle > 90 and angle < 270
+		return perception.getStrongestPheromone(types, self.getColony(), leadsAway)
 		
 	def _harvestResource(self, field, types):
 		"""
@@ -1428,9 +1990,8 @@ class Worker(FieldUnt):
 		@rtype: bool
 		@return: True if resources were harvested.
 		"""
-		resources = self.objectsInLoS(field, types)
-		if resources:
-			resource = resources[0]
+		resource = self.locateResource(field, types)
+		if resource:
 			position = resource.getPosition()
 			if map.calcDistance(self.getPosition(), position) == 1:
 				harvested = resource.harvest(self.getColony().WORKERS['carrying_capacity'])
@@ -1442,25 +2003,27 @@ class Worker(FieldUnt):
 					self._follow(self.locateNearestHill(field))
 					return True
 				else:
-					self._avoid.append(resources[0])
-					self._status = STATUS_WANDERING
+					self._avoid.append(resource)
+					self._setStatus(STATUS_WANDERING)
 			else:
-				if not resources[0] in self._avoid:
-					self._follow(resources[0])
+				if not resource in self._avoid:
+					self._follow(resource)
 		return False
 		
-	def _reactToPheromone(self, field, types):
+	def _reactToPheromone(self, field, perception, types):
 		"""
 		Causes this unt to sense pheromones and react accordingly.
 		
 		@type field: inerts.Field
 		@param field: The field from which information will be read.
+		@type perception: Perception
+		@param perception: What this unt has sensed.
 		@type types: sequence
 		@param types: A list of pheromone types this unt will try to sense.
 		
 		@return: Nothing.
 		"""
-		signal = self._getStrongestResourceSignal(field, types)
+		signal = self._getStrongestResourceSignal(field, perception, types)
 		if signal:
 			self._follow(signal)
 			
@@ -1470,7 +2033,7 @@ class Worker(FieldUnt):
 		else: #Scatter.
 			paths = [space for space in new_field.getSpace(self._position).getMoore() if abs(map.findAngle(self._position, space.getPosition()) - map.findAngle(self._position, map.findClosestEntity(self._position, self._avoid)[0])) >= 90]
 			if paths:
-				self.setOrientation(map.findAngle(self._position, RANDOMIZER.choice(paths).getPosition()))
+				self._face(self._random.choice(paths).getPosition())
 				self._advance(new_field)
 			else: #Impossible to move away, so cower in fear.
 				pass
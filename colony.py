@@ -5,7 +5,10 @@ unts.
 """
 from shared import *
 import agents
+import map
+import shared
 
+import array
 import math
 
 class Colony(object):
@@ -32,8 +35,13 @@ class Colony(object):
 	_available_food = None #: The total amount of food that this colony has in reserve.
 	_available_water = None #: The total amount of water that this colony has in reserve.
 	_hills = None #: The hills that exist under this colony.
+	_hill_labels = None #: For every space on the field, in row-major order, the index within _hills of the nearest hill, or None if there are no hills.
+	_hill_distances = None #: For every space on the field, in row-major order, the distance to the nearest hill, or None if there are no hills.
+	_homing = None #: For every space on the field, the number of steps to the nearest hill around walls, or a terrain.Route to the hills if shared.TERRAIN plans routes; None if it must be rebuilt.
+	_homing_version = None #: The version of shared.TERRAIN from which _homing was built.
 	_reproduction = None #: The number of ticks left until this colony tries to reproduce again.
 	_architects = None #: The architects this colony currently has in play.
+	_random = None #: The shared.RandomStream from which this colony's hills derive their streams.
 	
 	def __init__(self, config_data):
 		"""
@@ -110,6 +118,7 @@ class Colony(object):
 		self._hills = []
 		self._architects = []
 		self._reproduction = ENVIRONMENT.REPRODUCTION
+		self._random = RANDOMIZER.substream()
 		
 	def addFood(self, amount):
 		"""
@@ -132,6 +141,8 @@ class Colony(object):
 		@return: Nothing.
 		"""
 		self._hills.append(hill)
+		self._labelHill(len(self._hills) - 1)
+		self._homing = None
 		
 	def addUnt(self, unt):
 		"""
@@ -206,6 +217,88 @@ class Colony(object):
 		"""
 		return self._hills[:]
 		
+	def getHomingDirection(self, position, preferred):
+		"""
+		Determines which way an unt should step to get to the nearest hill by
+		the shortest route around walls.
+		
+		The route map is rebuilt only when a hill is added or a wall changes on
+		a hill, and otherwise only patched around walls that have changed since,
+		so each call takes the same small amount of time. If the terrain is
+		divided into chunks, a terrain.Route is used instead, which only
+		searches as far as unts actually wander, and which is planned again
+		whenever the terrain changes.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the unt.
+		@type preferred: int
+		@param preferred: The index, in map.DIRECTIONS, of the direction to take
+		    if it is on a shortest route.
+		
+		@rtype: int
+		@return: The index, in map.DIRECTIONS, of the direction to take, or None
+		    if the unt is already at a hill or no route is known.
+		"""
+		terrain = shared.TERRAIN
+		if terrain is None or not self._hills:
+			return None
+			
+		if self._homing is not None and not terrain.getChunkSize() and not self._homing_version == terrain.getVersion():
+			changes = terrain.getChanges(self._homing_version)
+			goals = [hill.getPosition() for hill in self._hills]
+			for changed in changes:
+				if changed in goals: #Repairs cannot restore a hill that was walled over.
+					self._homing = None
+					break
+			else:
+				for changed in changes: #Patch only what the changes affected.
+					terrain.repairDistanceField(self._homing, changed)
+				self._homing_version = terrain.getVersion()
+				
+		if self._homing is None or not self._homing_version == terrain.getVersion():
+			goals = [hill.getPosition() for hill in self._hills]
+			if terrain.getChunkSize():
+				self._homing = terrain.planRoute(goals)
+			else:
+				self._homing = terrain.buildDistanceField(goals)
+			self._homing_version = terrain.getVersion()
+			
+		if terrain.getChunkSize():
+			return self._homing.getDirection(position, preferred)
+		return terrain.getDownhillDirection(self._homing, position, preferred)
+		
+	def getNearestHill(self, position):
+		"""
+		Returns the hill closest to the specified position. When several hills
+		are equally close, the choice matches sorting (distance, hill) pairs.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of a space on the field.
+		
+		@rtype: inerts.Hill
+		@return: The closest hill, or None if this colony has no hills.
+		"""
+		if self._hill_labels is None:
+			return None
+		(x, y) = position
+		return self._hills[self._hill_labels[y * ENVIRONMENT.FIELD_WIDTH + x]]
+		
+	def getNearestHillDistance(self, position):
+		"""
+		Returns the distance from the specified position to the closest hill.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of a space on the field.
+		
+		@rtype: int
+		@return: The distance to the closest hill, or None if this colony has no
+		    hills.
+		"""
+		if self._hill_distances is None:
+			return None
+		(x, y) = position
+		return self._hill_distances[y * ENVIRONMENT.FIELD_WIDTH + x]
+		
 	def getRiskFood(self):
 		"""
 		Gets a risk-assessment value related to this colony's available food
@@ -323,6 +416,19 @@ class Colony(object):
 			return True
 		return False
 		
+	def spawnStream(self, key):
+		"""
+		Derives a random stream for something that belongs to this colony.
+		
+		@type key: hashable
+		@param key: A value that uniquely identifies the new stream's owner within
+		    this colony.
+		
+		@rtype: shared.RandomStream
+		@return: The new stream.
+		"""
+		return self._random.substream(key)
+		
 	def tick(self):
 		"""
 		Executes housekeeping tasks that need to be performed every iteration.
@@ -354,6 +460,34 @@ class Colony(object):
 				self._reproduction = ENVIRONMENT.REPRODUCTION
 				self._reproduce(unts_new)
 				
+	def _labelHill(self, index):
+		"""
+		Updates the nearest-hill map to account for a newly added hill. Only
+		the spaces that the new hill is closer to are relabelled.
+		
+		@type index: int
+		@param index: The index of the new hill within _hills.
+		
+		@return: Nothing.
+		"""
+		hill = self._hills[index]
+		hill_position = hill.getPosition()
+		width = ENVIRONMENT.FIELD_WIDTH
+		positions = [(x, y) for y in range(ENVIRONMENT.FIELD_HEIGHT) for x in range(width)]
+		if self._hill_labels is None:
+			self._hill_labels = array.array('i', [index]) * len(positions)
+			self._hill_distances = array.array('i', [map.calcDistance(position, hill_position) for position in positions])
+			return
+			
+		labels = self._hill_labels
+		distances = self._hill_distances
+		hills = self._hills
+		for i in range(len(positions)):
+			distance = map.calcDistance(positions[i], hill_position)
+			if (distance, hill) < (distances[i], hills[labels[i]]):
+				labels[i] = index
+				distances[i] = distance
+				
 	def _reproduce(self, unts_new):
 		"""
 		Determines which hills will got how much of the new brood, and causes them
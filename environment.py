@@ -17,6 +17,8 @@ class Environment(object):
 	
 	#Pathfinding
 	WANDER_VARIANCE = None #: The probability that an agent will deviate from its current heading with each step.
+	PATHFINDING_CHUNKS = None #: If greater than 0, unts find their way home through square chunks of the field this many spaces wide, searching only the chunks they pass through.
+	RESOURCE_MAP = None #: If True, workers and architects find resources through a precomputed map rather than by searching their sight every tick.
 	
 	#Reproduction
 	GENERATION_MINIMUM = None #: A new brood must be at least this big, relative to the previous one, for reproduction to occur; used to prevent waste.
@@ -28,6 +30,8 @@ class Environment(object):
 	#Signals
 	SIGNALS_DISPERSION_FACTOR = None #: How much of a pheromone persists after each cycle.
 	SIGNALS_COLLISION_FACTOR = None #: How effectively like pheromones stack.
+	SIGNALS_DIFFUSION = None #: The share of each pheromone's strength that spreads into the spaces around it every cycle.
+	SIGNALS_BUDGET = None #: If greater than 0, no more than this many pheromones may exist at once.
 	
 	#Threats
 	KILL_TIME_ARCHITECT = None #: How long a threat will idle after killing an architect.
@@ -68,6 +72,8 @@ class Environment(object):
 		self.MIN_BUILD_DISTANCE = config_data.get('min_build_distance')
 		
 		self.WANDER_VARIANCE = config_data.get('wander_variance')
+		self.PATHFINDING_CHUNKS = config_data.get('pathfinding_chunks')
+		self.RESOURCE_MAP = config_data.get('resource_map')
 		
 		self.GENERATION_MINIMUM = config_data.get('generation_minimum')
 		self.REPRODUCTION = config_data.get('reproduction')
@@ -77,6 +83,8 @@ class Environment(object):
 		
 		self.SIGNALS_DISPERSION_FACTOR = config_data.get('signals_dispersion_factor')
 		self.SIGNALS_COLLISION_FACTOR = config_data.get('signals_collision_factor')
+		self.SIGNALS_DIFFUSION = config_data.get('signals_diffusion')
+		self.SIGNALS_BUDGET = config_data.get('signals_budget')
 		
 		self.KILL_TIME_ARCHITECT = config_data.get('kill_time_architect')
 		self.KILL_TIME_WARRIOR = config_data.get('kill_time_warrior')
@@ -6,6 +6,7 @@ from shared import *
 import shared
 import breve
 import agents
+import math
 
 class Inert(shared.Traceable, breve.Stationary):
 	"""
@@ -55,6 +56,8 @@ class Hill(Inert):
 	_builders = None #: A list of all builders currently attached to this hill.
 	_warriors = None #: A list of all warriors currently attached to this hill.
 	_workers = None #: A list of all corkers currently attached to this hill.
+	_resting = None #: A list of all field unts waiting in this hill to be dispatched.
+	_random = None #: The shared.RandomStream from which this hill's unts derive their streams.
 	_warriors_killed = 0 #: The number of warriors dispatched from this hill that were slain since the last generation.
 	_workers_killed = 0 #: The number of workers dispatched from this hill that were slain since the last generation.
 	_workers_lastgen = 0 #: The number of warriors spawned at this hill in the last generation.
@@ -77,7 +80,9 @@ class Hill(Inert):
 		self._builders = []
 		self._warriors = []
 		self._workers = []
+		self._resting = []
 		self._colony = colony
+		self._random = colony.spawnStream(position)
 		colony.addHill(self)
 		
 		self.setShape(breve.createInstances(breve.Cube, 1).initWith(breve.vector(0.75, 0.75, 0.75)))
@@ -281,8 +286,22 @@ class Hill(Inert):
 			self._workers.remove(unt)
 			if killed:
 				self._workers_killed += 1
+		if unt in self._resting:
+			self._resting.remove(unt)
 		self._colony.removeUnt(unt)
 		
+	def restUnt(self, unt):
+		"""
+		Queues a field unt that has been spawned in or has arrived at this hill
+		so that it will be dispatched on the next tick.
+		
+		@type unt: agents.FieldUnt
+		@param unt: The unt that is resting.
+		
+		@return: Nothing.
+		"""
+		self._resting.append(unt)
+		
 	def spawnGeneration(self, unts_new):
 		"""
 		Determines how to divy up the number of new unts this hill will spawn. 
@@ -337,6 +356,15 @@ class Hill(Inert):
 		self._workers_unsuccessful = 0
 		self._workers_returned = 0
 		
+	def spawnStream(self):
+		"""
+		Derives a random stream for a newly spawned unt.
+		
+		@rtype: shared.RandomStream
+		@return: The new stream.
+		"""
+		return self._random.substream()
+		
 	def summonBuilders(self):
 		"""
 		Causes this hill to scrap all of its builders and returns the number that
@@ -351,6 +379,18 @@ class Hill(Inert):
 			self.removeUnt(builder)
 		return count
 		
+	def takeRestingUnts(self):
+		"""
+		Returns the field unts waiting in this hill to be dispatched, clearing the
+		queue.
+		
+		@rtype: list
+		@return: The unts that were resting in this hill.
+		"""
+		resting = self._resting
+		self._resting = []
+		return resting
+		
 	def _calculateInsecurity(self, killed):
 		"""
 		Determines the insecurity co-efficient used to control the rate of growth
@@ -375,13 +415,20 @@ class Hill(Inert):
 class Pheromone(shared.Traceable):
 	"""
 	A signal that allows agents to communicate information.
+	
+	Pheromones decay by ENVIRONMENT.SIGNALS_DISPERSION_FACTOR with every tick,
+	but rather than being updated each tick, they remember their strength at
+	the tick on which they were last deposited or joined, and work out their
+	current strength from shared.CLOCK when asked.
 	"""
 	_exists = True #: False once this pheromone has dispersed and is awaiting deletion.
 	_colony = None #: The colony with which this pheromone is associated, if any.
-	_intensity = None #: The current strength of this pheromone.
+	_intensity = None #: The strength of this pheromone as of _birth.
+	_birth = None #: The tick on which this pheromone last had its strength set.
+	_expiry = None #: The first tick on which this pheromone will be too weak to exist, or None if it will never decay.
 	_type = None #: A signal constant indicating the natur of the message communicated by this pheromone.
 	
-	def __init__(self, type, colony, intensity, position):
+	def __init__(self, type, colony, intensity, position, birth=None):
 		"""
 		Creates a new Pheromone.
 		
@@ -393,12 +440,35 @@ class Pheromone(shared.Traceable):
 		    if it is associated with a threat.
 		@type position: tuple
 		@param position: The (x, y) co-ordinates of this pheromone.
+		@type birth: int
+		@param birth: The tick on which this pheromone was deposited with the
+		    given intensity, if earlier than shared.CLOCK.
 		"""
 		shared.Traceable._init(self, position)
 		
 		self._type = type
 		self._colony = colony
-		self._intensity = intensity
+		self._setIntensity(intensity, birth)
+		
+	def absorbDeposits(self, strongest, rest):
+		"""
+		Merges fresh deposits of like pheromone into this one. The strongest of
+		this pheromone and the deposits keeps its full strength, and all others
+		are added as though each had joined it through boostIntensity().
+		
+		@type strongest: number
+		@param strongest: The intensity of the strongest deposit, as of
+		    shared.CLOCK.
+		@type rest: number
+		@param rest: The combined intensity of all other deposits, as of
+		    shared.CLOCK.
+		
+		@return: Nothing.
+		"""
+		intensity = self.getIntensity()
+		if strongest > intensity:
+			(intensity, strongest) = (strongest, intensity)
+		self._setIntensity(intensity + (strongest + rest) * ENVIRONMENT.SIGNALS_COLLISION_FACTOR)
 		
 	def boostIntensity(self, amount):
 		"""
@@ -410,7 +480,7 @@ class Pheromone(shared.Traceable):
 		
 		@return: Nothing.
 		"""
-		self._intensity += amount * ENVIRONMENT.SIGNALS_COLLISION_FACTOR
+		self._setIntensity(self.getIntensity() + amount * ENVIRONMENT.SIGNALS_COLLISION_FACTOR)
 		
 	def disperse(self):
 		"""
@@ -421,7 +491,7 @@ class Pheromone(shared.Traceable):
 		"""
 		if self._exists:
 			self._exists = False
-			return self._intensity
+			return self.getIntensity()
 		return 0
 		
 	def exists(self):
@@ -439,14 +509,25 @@ class Pheromone(shared.Traceable):
 	def getColony(self):
 		return self._colony
 		
+	def getExpiry(self):
+		"""
+		Indicates when this pheromone will disperse, unless it is joined by
+		another first.
+		
+		@rtype: int
+		@return: The first tick on which this pheromone's strength will be below
+		    1, or None if it will never decay.
+		"""
+		return self._expiry
+		
 	def getIntensity(self):
 		"""
 		Indicates the absolute strength of this pheromone.
 		
 		@rtype: number
-		@return: The strength of this pheromone.
+		@return: The strength of this pheromone as of shared.CLOCK.
 		"""
-		return self._intensity
+		return self._intensity * ENVIRONMENT.SIGNALS_DISPERSION_FACTOR ** (shared.CLOCK - self._birth)
 		
 	def getType(self):
 		"""
@@ -457,16 +538,60 @@ class Pheromone(shared.Traceable):
 		"""
 		return self._type
 		
-	def tick(self):
+	def spread(self, kept, gained):
 		"""
-		Causes this pheromone to decay.
+		Sets this pheromone's strength after diffusion.
 		
-		@return: Nothing.
+		@type kept: float
+		@param kept: The share of its own strength that this pheromone keeps.
+		@type gained: number
+		@param gained: The strength that has spread into this pheromone's space
+		    from like pheromones around it.
+		
+		@rtype: bool
+		@return: False if this pheromone has become too weak to be smelled, in
+		    which case it has dispersed; unlike a fresh deposit, it is not given
+		    a tick's grace.
 		"""
-		self._intensity *= ENVIRONMENT.SIGNALS_DISPERSION_FACTOR
-		if self._intensity < 1:
+		intensity = self.getIntensity() * kept + gained
+		self._setIntensity(intensity)
+		if intensity < 1:
 			self.disperse()
+			return False
+		return True
+		
+	def _setIntensity(self, intensity, birth=None):
+		"""
+		Sets the strength of this pheromone as of a tick and works out when it
+		will disperse.
+		
+		@type intensity: number
+		@param intensity: The new strength of this pheromone.
+		@type birth: int
+		@param birth: The tick as of which the strength applies, or None for
+		    shared.CLOCK.
+		
+		@return: Nothing.
+		"""
+		if birth is None:
+			birth = shared.CLOCK
+		self._intensity = intensity
+		self._birth = birth
+		
+		factor = ENVIRONMENT.SIGNALS_DISPERSION_FACTOR
+		if factor >= 1:
+			self._expiry = None
+			return
 			
+		steps = 1 #Even the weakest pheromone survives the tick on which it is deposited.
+		if intensity >= 1 and factor > 0:
+			steps = max(1, int(math.log(intensity) / -math.log(factor)))
+			while intensity * factor ** steps >= 1:
+				steps += 1
+			while steps > 1 and intensity * factor ** (steps - 1) < 1:
+				steps -= 1
+		self._expiry = self._birth + steps
+		
 			
 class Resource(object):
 	"""
@@ -5,35 +5,68 @@ Unts module: map; contains objects used to model the state of the system.
 from shared import *
 import agents
 import inerts
+import shared
+import array
+import heapq
 import math
 
 FOUR_PI = 4 * math.pi #: A value needed for inverse-square calculations.
 
+DIRECTIONS = tuple(range(8)) #: The eight directions in which an agent may travel, clockwise from up.
+DIRECTION_OFFSETS = (
+ (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)
+) #: The (x, y) step taken when travelling in each direction; this matches the ordering of Space neighbourhoods.
+ANGLE_DIRECTIONS = tuple([((angle + 22) / 45) % 8 for angle in range(360)]) #: The direction that corresponds to every integer angle.
+
+_ANGLES = {} #: A cache of the angles computed by findAngle(), keyed by (x, y) offset.
+_GOAL_DIRECTIONS = {} #: A cache of the directions computed by findDirection(), keyed by (x, y) offset.
+_SENSE_OFFSETS = {} #: A cache of the (x, y) offsets that fall within each sense range, ordered by increasing distance.
+_SENSE_TABLES = {} #: A cache of (x offset, y offset, flat offset) tables, keyed by (sense range, field width).
+_NEIGHBOUR_TABLES = {} #: A cache of flat neighbour-index tables, keyed by field dimensions.
+
+OCCUPANCY_BLOCK = 4 #: The width and height, in spaces, of each cell in a field's occupancy grids.
+PYRAMID_BLOCK = 4 #: The width and height, in spaces, of the smallest blocks in a PheromonePyramid.
+
 class Field(object):
 	"""
 	The map of a state of the system's execution.
 	"""
-	_grid = None #: The structure of spaces within this field.
-	_pool = None #: All spaces within this field in an arbitrary linear ordering.
+	_pool = None #: All spaces within this field in row-major order; spaces are created when first accessed, so unused slots are None.
+	_neighbours = None #: The shared table of neighbour indices for fields of this size; see _getNeighbourTable().
 	_dimensions = None #: The (width, hight) dimesions of this field.
-	_pheromones = None #: A list of all pheromones within this field.
+	_pheromones = None #: Every pheromone, bucketed by (type, colony) within a dictionary for each space that has any, keyed by the index of the space; handed from field to field.
+	_expiry = None #: A heap of (tick, pheromone) pairs giving the tick on which each pheromone will have dispersed; handed from field to field.
+	_evictions = 0 #: The number of pheromones dispersed early to keep within ENVIRONMENT.SIGNALS_BUDGET when this field took them over.
+	_pyramid = None #: The PheromonePyramid used to find pheromones that can be smelled; handed from field to field.
+	_scented = None #: The indices of the spaces that have received pheromones, in the order in which they first did.
+	_occupancy = None #: The number of agents in each block of OCCUPANCY_BLOCK spaces, keyed by (type, colony).
+	_occupancy_integrals = None #: Summed-area tables of the occupancy grids, built when first queried.
+	_occupancy_width = None #: The number of occupancy blocks in each row of this field.
+	_queries = None #: The results of queries made against this field, keyed by the query and its arguments.
+	_query_hits = 0 #: The number of queries answered from _queries.
+	_query_misses = 0 #: The number of queries that had to be computed.
 	
 	def __init__(self, dimensions):
 		"""
 		Creates a new Field.
 		
+		Spaces are not built until something accesses them, so creating a field
+		costs next to nothing.
+		
 		@type dimensions: tuple
 		@param dimensions: The (width, height) dimensions of this field.
 		"""
 		self._dimensions = (x, y) = dimensions
-		self._pool = []
-		self._pheromones = []
-		self._grid = tuple([tuple([Space() for i in range(x)]) for j in range(y)])
-		for (y, row) in enumerate(self._grid):
-			for (x, space) in enumerate(row):
-				self._pool.append(space)
-				space.initialize(self, (x, y))
-		self._pool = tuple(self._pool) #Can't use sets in 2.3.
+		self._pool = [None] * (x * y)
+		self._neighbours = _getNeighbourTable(dimensions)
+		self._pheromones = {}
+		self._expiry = []
+		self._pyramid = PheromonePyramid(dimensions)
+		self._scented = []
+		self._occupancy = {}
+		self._occupancy_integrals = {}
+		self._occupancy_width = (x + OCCUPANCY_BLOCK - 1) / OCCUPANCY_BLOCK
+		self._queries = {}
 		
 	def addObject(self, obj):
 		"""
@@ -49,22 +82,12 @@ class Field(object):
 		if space:
 			space.addObject(obj)
 			
-	def addPheromone(self, pheromone):
-		"""
-		Registers a new pheromone in this field's collection.
-		
-		@type pheromone: inerts.Pheromone
-		@param pheromone: The pheromone to be registered.
-		
-		@return: Nothing.
-		"""
-		self._pheromones.append(pheromone)
-		
-	def clearPath(self, start, end, pheromone=False, path=None):
+	def clearPath(self, start, end, pheromone=False):
 		"""
 		Determines whether end can be reached from start.
 		
-		This is a recursive function, but its impact shouldn't be all that great.
+		Note:: Older versions of this function were recursive; stepping is now
+		done in a loop, using findDirection()'s cached directions.
 		
 		@type start: tuple
 		@param start: The (x, y) co-ordinates at which pathfinding will begin.
@@ -72,8 +95,6 @@ class Field(object):
 		@param end: The (x, y) co-ordinate that is being sought.
 		@type pheromone: bool
 		@param pheromone: True if sponges should be considered walls.
-		@type path: list
-		@param path: A variable used by recursion; do not specify.
 		
 		@rtype: tuple
 		@return: A boolean variable denoting the success of the operation and a
@@ -82,22 +103,91 @@ class Field(object):
 		    paths will be clear by nature.
 		"""
 		if WALLS:
-			if path is None:
-				path = []
-			path.append(self.getSpace(start))
-			
-			next = nextPositionByGoal(start, end)
-			next_space = self.getSpace(next)
-			if start == end or not next_space:
-				return (True, path)
-				
-			if not next_space.isOpen(pheromone):
-				return (False, path)
-				
-			return self.clearPath(next, end, pheromone, path)
+			path = [self.getSpace(start)]
+			(x, y) = start
+			(x_end, y_end) = end
+			while not (x == x_end and y == y_end):
+				(x_offset, y_offset) = DIRECTION_OFFSETS[findDirection((x, y), end)]
+				x += x_offset
+				y += y_offset
+				next_space = self.getSpace((x, y))
+				if not next_space:
+					break
+				if not next_space.isOpen(pheromone):
+					return (False, path)
+				path.append(next_space)
+			return (True, path)
 		else:
 			return (True, [])
 			
+	def countAgent(self, key, position):
+		"""
+		Registers an agent in this field's occupancy grids. This is called by
+		Space.addAgent(), and for the unts leaving each hill, which the active
+		unts may see before they are added to any field.
+		
+		@type key: tuple
+		@param key: The (type, colony) of the agent being registered.
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the agent.
+		
+		@return: Nothing.
+		"""
+		counts = self._occupancy.get(key)
+		if counts is None:
+			(x_max, y_max) = self._dimensions
+			counts = array.array('i', [0]) * (self._occupancy_width * ((y_max + OCCUPANCY_BLOCK - 1) / OCCUPANCY_BLOCK))
+			self._occupancy[key] = counts
+		else:
+			self._occupancy_integrals.pop(key, None)
+			
+		(x, y) = position
+		counts[(y / OCCUPANCY_BLOCK) * self._occupancy_width + x / OCCUPANCY_BLOCK] += 1
+		
+	def countAgents(self, position, radius, types=None):
+		"""
+		Counts the agents that were added to this field within a square of the
+		specified radius around a position; this takes the same time however
+		large the square is.
+		
+		Counts are kept per block of OCCUPANCY_BLOCK spaces, and every block the
+		square touches is counted whole, so the result may include agents a few
+		spaces beyond the radius. It never misses one inside it, so a count of
+		zero means there is nothing to look for. Visibility is not considered.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates at the centre of the square.
+		@type radius: int
+		@param radius: The distance from the centre to each edge of the square.
+		@type types: sequence
+		@param types: The types of agent to be counted. All types will be
+		    counted if not specified.
+		
+		@rtype: int
+		@return: The number of agents found.
+		"""
+		(x, y) = position
+		(x_max, y_max) = self._dimensions
+		x_start = max(x - radius, 0) / OCCUPANCY_BLOCK
+		x_end = min(x + radius, x_max - 1) / OCCUPANCY_BLOCK + 1
+		y_start = max(y - radius, 0) / OCCUPANCY_BLOCK
+		y_end = min(y + radius, y_max - 1) / OCCUPANCY_BLOCK + 1
+		if x_start >= x_end or y_start >= y_end:
+			return 0
+			
+		stride = self._occupancy_width + 1
+		total = 0
+		for (key, counts) in self._occupancy.iteritems():
+			if types and not key[0] in types:
+				continue
+				
+			integral = self._occupancy_integrals.get(key)
+			if integral is None:
+				integral = self._buildOccupancyIntegral(counts)
+				self._occupancy_integrals[key] = integral
+			total += integral[y_end * stride + x_end] - integral[y_start * stride + x_end] - integral[y_end * stride + x_start] + integral[y_start * stride + x_start]
+		return total
+		
 	def exists(self, target):
 		"""
 		Determines whether an entity can be seen in this field.
@@ -120,35 +210,61 @@ class Field(object):
 			
 	def flowPheromones(self, field):
 		"""
-		Reads pheromones from the provided previous field and transposes an
-		updated map into this one.
+		Takes over the pheromones of the provided previous field, combining
+		those deposited while it was current with those already present and
+		discarding those that have dispersed.
+		
+		Pheromones decay lazily, against shared.CLOCK, so pheromones that are
+		neither joined nor dispersing cost nothing here, unless
+		ENVIRONMENT.SIGNALS_DIFFUSION makes every pheromone spread. If more
+		pheromones remain than ENVIRONMENT.SIGNALS_BUDGET allows, the weakest
+		are then evicted; see getEvictions().
 		
 		@type field: Field
 		@param field: The old field.
 		
-		@return: Nothing.
+		@rtype: int
+		@return: The number of pheromones deposited or dispersed, including
+		    those evicted.
 		"""
+		self._pheromones = pheromones = field._pheromones
+		self._expiry = expiry = field._expiry
+		self._pyramid = pyramid = field._pyramid
 		pheromones_processed = 0
-		for old_space in field.getAllSpaces():
-			#Finalize distribution.
-			old_space.sumPheromones()
-			
-			space = self.getSpace(old_space.getPosition())
-			for pheromone in old_space.getPheromones():
-				pheromone.tick()
-				if pheromone.exists():
-					space.setPheromone(pheromone)
+		for old_space in field.getScentedSpaces():
+			index = old_space.getIndex()
+			buckets = pheromones.get(index)
+			if buckets is None:
+				buckets = pheromones[index] = {}
+			for pheromone in old_space.sumPheromones(buckets):
+				self._recordPheromone(pheromone)
+				pheromones_processed += 1
+				
+		while expiry and expiry[0][0] <= shared.CLOCK:
+			(tick, pheromone) = heapq.heappop(expiry)
+			if pheromone.exists() and pheromone.getExpiry() == tick: #Not since joined by another.
+				self._dispersePheromone(pheromone)
 				pheromones_processed += 1
-		return pheromones_processed
+				
+		if ENVIRONMENT.SIGNALS_DIFFUSION:
+			pheromones_processed += self._diffusePheromones(ENVIRONMENT.SIGNALS_DIFFUSION)
+			
+		budget = ENVIRONMENT.SIGNALS_BUDGET
+		if budget and pyramid.countPheromones() > budget:
+			self._evictions = self._evictPheromones(pyramid.countPheromones() - budget)
+		return pheromones_processed + self._evictions
 		
 	def getAllSpaces(self):
 		"""
-		Returns all spaces that comprise this field; order is not defined.
+		Returns all spaces that comprise this field, in row-major order, so that
+		the space at (x, y) has index y * width + x.
 		
-		@rtype: tuple
+		Caution:: Every space will be created if it does not already exist.
+		
+		@rtype: list
 		@return: A collection of all spaces in this field.
 		"""
-		return self._pool
+		return self._getSpacesAt(range(len(self._pool)))
 		
 	def getDimensions(self):
 		"""
@@ -159,16 +275,98 @@ class Field(object):
 		"""
 		return self._dimensions
 		
-	def getPheromones(self):
+	def getEvictions(self):
 		"""
-		Returns all pheromones present in this field.
+		Indicates how many pheromones were dispersed early, when this field took
+		them over, to keep within ENVIRONMENT.SIGNALS_BUDGET.
 		
-		Caution:: The list returned is not a copy. Do not modify.
+		@rtype: int
+		@return: The number of pheromones evicted.
+		"""
+		return self._evictions
+		
+	def getPheromoneBuckets(self, index):
+		"""
+		Returns the pheromones in a space.
+		
+		Caution:: The dictionary returned is not a copy. Do not modify.
+		
+		@type index: int
+		@param index: The index of the space within getAllSpaces().
+		
+		@rtype: dict
+		@return: Single-pheromone lists keyed by (type, colony), or None if the
+		    space holds no pheromones.
+		"""
+		return self._pheromones.get(index)
+		
+	def getPheromoneKeys(self, types=None, colony=None):
+		"""
+		Lists the kinds of pheromone that may be present in this field and
+		match the specified criteria. Pheromones are partitioned by kind, so
+		queries need only visit the partitions listed here.
+		
+		@type types: sequence
+		@param types: A list of types by which the kinds should be filtered. If
+		    not specified, all types will be considered valid.
+		@type colony: colony.Colony
+		@param colony: The colony by which the kinds should be filtered. If not
+		    specified, all colonies will be considered valid. Pheromones
+		    associated with threats match every colony.
+		
+		@rtype: list
+		@return: (type, colony) pairs.
+		"""
+		keys = self._pyramid.getKeys()
+		if types:
+			keys = [key for key in keys if key[0] in types]
+		if colony:
+			keys = [key for key in keys if not key[1] or key[1] is colony]
+		return keys
+		
+	def getPheromones(self, types=None, colony=None):
+		"""
+		Returns all pheromones present in this field that match the specified
+		criteria.
+		
+		@type types: sequence
+		@param types: A list of types by which the query should be filtered. If
+		    not specified, all types will be considered valid.
+		@type colony: colony.Colony
+		@param colony: The colony by which the query should be filtered. If not
+		    specified, all colonies will be considered valid. Pheromones
+		    associated with threats match every colony.
+		
+		@rtype: list
+		@return: A list of the matching pheromones.
+		"""
+		pheromones = []
+		for key in self.getPheromoneKeys(types, colony):
+			pheromones += self._pyramid.getPheromones(key)
+		return pheromones
+		
+	def getQueryStatistics(self):
+		"""
+		Indicates how effective this field's query cache has been.
+		
+		@rtype: tuple
+		@return: The number of queries answered from the cache and the number
+		    that had to be computed.
+		"""
+		return (self._query_hits, self._query_misses)
+		
+	def getScentedSpaces(self):
+		"""
+		Returns the spaces in this field that have received pheromones, which
+		are usually a small fraction of all spaces.
 		
 		@rtype: list
-		@return: A list of all pheromones in this field.
+		@return: A collection of spaces in this field, in row-major order.
 		"""
-		return self._pheromones#[:] (I'll trust myself 'cause duplicating this over and over would be super-expensive.
+		indices = self._scented[:]
+		indices.sort()
+		pool = self._pool
+		return [pool[index] for index in indices]
 		
 	def getSpace(self, position):
 		"""
@@ -183,14 +381,66 @@ class Field(object):
 		(x, y) = position
 		(x_max, y_max) = self._dimensions
 		if y >= 0 and x >= 0 and y < y_max and x < x_max:
-			return self._grid[y][x]
+			index = y * x_max + x
+			return self._pool[index] or self._createSpace(index)
 		return None
 		
+	def getNeighbours(self, index, directions=DIRECTIONS):
+		"""
+		Returns the spaces adjacent to the indexed space in the specified
+		directions. Directions that lead out of this field are skipped.
+		
+		@type index: int
+		@param index: The index of the space, within getAllSpaces(), whose
+		    neighbours are being sought.
+		@type directions: sequence
+		@param directions: The indices, within DIRECTIONS, of the neighbours to
+		    return.
+		
+		@rtype: list
+		@return: A list of the requested spaces.
+		"""
+		table = self._neighbours
+		base = index * 8
+		return self._getSpacesAt([table[base + direction] for direction in directions if table[base + direction] >= 0])
+		
+	def getSpaceIndices(self, position, sense_range):
+		"""
+		Builds a list of the indices, within getAllSpaces(), of all spaces within
+		a specified distance from the specified space. Returned indices are
+		sorted in order of proximity.
+		
+		The offsets that make up each sense range are computed only once; when
+		the whole range lies within this field, no bounds-checking is needed.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates around which construction will
+		    occur.
+		@type sense_range: int
+		@param sense_range: The distance limiter.
+		
+		@rtype: list
+		@return: A list of the indices of all spaces in range of the specified
+		    position, ordered by increasing distance.
+		"""
+		(x, y) = position
+		(width, height) = self._dimensions
+		base = y * width + x
+		table = _getSenseTable(sense_range, width)
+		if x >= sense_range and y >= sense_range and x + sense_range < width and y + sense_range < height:
+			return [base + offset for (x_offset, y_offset, offset) in table]
+			
+		(x_min, y_min, x_max, y_max) = (-x, -y, width - 1 - x, height - 1 - y)
+		return [base + offset for (x_offset, y_offset, offset) in table if x_min <= x_offset <= x_max and y_min <= y_offset <= y_max]
+		
 	def getSpaces(self, position, sense_range):
 		"""
 		Builds a list of all spaces within a specified distance from the
 		specified space. Returned spaces are sorted in order of proximity.
 		
+		Note:: A range of 1 describes the Moore neighbourhood, excluding the
+		specified space itself; all greater ranges include it.
+		
 		@type position: tuple
 		@param position: The (x, y) co-ordinates around which construction will
 		    occur.
@@ -201,18 +451,7 @@ class Field(object):
 		@return: A list of all spaces in range of the specified position, ordered
 		    by increasing distance.
 		"""
-		space = self.getSpace(position)
-		if sense_range == 1: #No work necessary.
-			return space.getVonNeumann() + space.getMooreNoOverlap()
-			
-		(x, y) = position
-		spaces = [space]
-		for i in range(1, sense_range + 1):
-			spaces += self._getSpacesArc(x, y - i, 1, 1, i)
-			spaces += self._getSpacesArc(x + i, y, -1, 1, i)
-			spaces += self._getSpacesArc(x, y + i, -1, -1, i)
-			spaces += self._getSpacesArc(x - i, y, 1, -1, i)
-		return spaces
+		return self._getSpacesAt(self.getSpaceIndices(position, sense_range))
 		
 	def getSpacesByProximity(self, position):
 		"""
@@ -229,7 +468,7 @@ class Field(object):
 		(x, y) = position
 		current_space = self.getSpace(position)
 		spaces_in_range = []
-		for space in self._pool:
+		for space in self.getAllSpaces():
 			spaces_in_range.append((current_space.calcDistance(space.getPosition()), space))
 		spaces_in_range.sort() #2.3 is limited. :(
 		return [space for (distance, space) in spaces_in_range]
@@ -247,7 +486,7 @@ class Field(object):
 		@rtype: list
 		@return: The requested list of spaces.
 		"""
-		return self._getAccessibleSpaces(position, range, False)
+		return self._getSpacesAt(self._getAccessibleIndices(position, range, False))
 		
 	def getSpacesInSmell(self, position, range):
 		"""
@@ -263,12 +502,43 @@ class Field(object):
 		@rtype: list
 		@return: The requested list of spaces.
 		"""
-		return self._getAccessibleSpaces(position, range, True)
+		return self._getSpacesAt(self._getAccessibleIndices(position, range, True))
 		
-	def _getAccessibleSpaces(self, position, range, smell):
+	def getStrongestPheromone(self, position, smell, key):
 		"""
-		Builds a list of all spaces that can be radially accessed from a given
-		position.
+		Finds the pheromone of one type and colony that seems strongest from a
+		position and whose path there is not blocked by walls or sponges.
+		
+		Every agent with the same sense of smell in the same space perceives
+		the same ranking, so the answer is worked out once per field and
+		shared.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the observer.
+		@type smell: int
+		@param smell: The observer's sense of smell; see calcInverseSquare().
+		@type key: tuple
+		@param key: The (type, colony) of the pheromones of interest.
+		
+		@rtype: tuple
+		@return: The (perceived intensity, pheromone) pair of the strongest
+		    pheromone, or None if none can be smelled.
+		"""
+		query = ('strongest', position, smell, key)
+		strongest = self.recallQuery(query)
+		if strongest is None:
+			strongest = ()
+			for (intensity, pheromone) in self.smellPartition(position, smell, key):
+				if self.isPathClear(position, pheromone.getPosition(), True):
+					strongest = (intensity, pheromone)
+					break
+			self.rememberQuery(query, strongest)
+		return strongest or None
+		
+	def _getAccessibleIndices(self, position, range, smell):
+		"""
+		Builds a list of the indices of all spaces that can be radially accessed
+		from a given position.
 		
 		@type position: tuple
 		@param position: The position around which spaces will be scanned.
@@ -278,78 +548,353 @@ class Field(object):
 		@param smell: True if sensing based on pheromones.
 		
 		@rtype: list
-		@return: A list of all spaces accessible from the current position,
-		    ordered by increasing distance.
+		@return: A list of the indices of all spaces accessible from the current
+		    position, ordered by increasing distance.
 		"""
-		spaces = self.getSpaces(position, range)
+		indices = self.getSpaceIndices(position, range)
 		if WALLS:
-			max_spaces = len(spaces) - 1
-			access_map = [None for space in spaces]
+			width = self._dimensions[0]
+			ranks = {}
+			for (rank, index) in enumerate(indices):
+				ranks[index] = rank
+			access_map = [None] * len(indices)
 			
-			reversed_spaces = spaces[:]
-			reversed_spaces.reverse() #2.3 is made of old. :(
-			for (i, space) in enumerate(reversed_spaces):
-				if access_map[i] is None:
-					#Work inward to reduce checks.
-					(result, path) = self.clearPath(space.getPosition(), position, smell)
+			rank = len(indices) - 1
+			while rank >= 0: #Work inward to reduce checks.
+				if access_map[rank] is None:
+					index = indices[rank]
+					(result, path) = self.clearPath((index % width, index / width), position, smell)
 					for p_space in path:
-						access_map[max_spaces - spaces.index(p_space)] = result
-						
-			access_map.reverse() #2.3 is made of old. :(
-			return [space for (space, shadow) in zip(spaces, access_map) if shadow]
+						(x, y) = p_space.getPosition()
+						p_rank = ranks.get(y * width + x)
+						if not p_rank is None:
+							access_map[p_rank] = result
+				rank -= 1
+				
+			return [index for (index, shadow) in zip(indices, access_map) if shadow]
 		else:
-			return spaces
+			return indices
 			
-	def _getSpacesArc(self, x, y, x_offset, y_offset, sense_range):
-		"""
-		Returns a line of spaces from a given starting position in a certain
-		direction.
-		
-		@type x: int
-		@param x: The x-co-ordinate at which gathering will begin.
-		@type y: int
-		@param y: The y-co-ordinate at which gathering will begin.
-		@type x_offset: int
-		@param x_offset: The amount to add to x each iteration.
-		@type y_offset: int
-		@param y_offset: The amount to add to y each iteration.
-		@type sense_range: int
-		@param sense_range: The length of the line to build.
+	def isPathClear(self, start, end, pheromone=False):
+		"""
+		Indicates whether end can be reached from start, remembering the answer
+		for the rest of this field's life; walls and sponges never change once a
+		field has been built.
+		
+		@type start: tuple
+		@param start: The (x, y) co-ordinates at which pathfinding will begin.
+		@type end: tuple
+		@param end: The (x, y) co-ordinate that is being sought.
+		@type pheromone: bool
+		@param pheromone: True if sponges should be considered walls.
+		
+		@rtype: bool
+		@return: True if the path is clear.
+		"""
+		if not WALLS:
+			return True
+			
+		key = ('path', start, end, pheromone)
+		clear = self.recallQuery(key)
+		if clear is None:
+			clear = self.clearPath(start, end, pheromone)[0]
+			self.rememberQuery(key, clear)
+		return clear
+		
+	def markScented(self, index):
+		"""
+		Records that a space has received its first pheromone, so that
+		flowPheromones() can visit it without scanning the whole field.
+		
+		@type index: int
+		@param index: The index of the space within getAllSpaces().
+		
+		@return: Nothing.
+		"""
+		self._scented.append(index)
+		
+	def recallQuery(self, key):
+		"""
+		Looks up the result of a query that was made against this field earlier.
+		
+		Caution:: Only queries whose results cannot change while agents are
+		reading this field may be cached: the pheromones it holds, its walls
+		and its objects. Agents move during a tick, so queries about them must
+		not be cached.
+		
+		@type key: tuple
+		@param key: The kind of query, followed by every argument that affects
+		    its result.
+		
+		@rtype: object
+		@return: The remembered result, or None if the query has not been made.
+		"""
+		result = self._queries.get(key)
+		if result is None:
+			self._query_misses += 1
+		else:
+			self._query_hits += 1
+		return result
+		
+	def rememberQuery(self, key, result):
+		"""
+		Stores the result of a query so that recallQuery() can return it later.
+		
+		@type key: tuple
+		@param key: The kind of query, followed by every argument that affects
+		    its result.
+		@type result: object
+		@param result: The result of the query; this must not be None.
+		
+		@return: Nothing.
+		"""
+		self._queries[key] = result
+		
+	def smellPartition(self, position, smell, key):
+		"""
+		Finds every pheromone in one partition, that of a single type and colony,
+		that is strong enough to be smelled from a position, without regard for
+		walls or sponges. Results are kept for the life of this field, so each
+		partition is only searched once per position and sense of smell.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the observer.
+		@type smell: int
+		@param smell: The observer's sense of smell; see calcInverseSquare().
+		@type key: tuple
+		@param key: The (type, colony) of the pheromones of interest.
 		
 		@rtype: list
-		@return: All spaces that exist along the constructed line.
+		@return: (perceived intensity, pheromone) pairs, strongest first.
+		
+		Caution:: The list returned is not a copy. Do not modify.
+		"""
+		query = ('scent', position, smell, key)
+		pheromones = self.recallQuery(query)
+		if pheromones is None:
+			pheromones = self._pyramid.gatherKey(position, smell, key, 1)
+			pheromones.sort()
+			pheromones.reverse()
+			self.rememberQuery(query, pheromones)
+		return pheromones
+		
+	def _buildOccupancyIntegral(self, counts):
+		"""
+		Builds a summed-area table from an occupancy grid. The table has an extra
+		leading row and column of zeroes, so that the value at
+		(y * (width + 1) + x) is the number of agents in all blocks above and to
+		the left of block (x, y).
+		
+		@type counts: array.array
+		@param counts: The occupancy grid to be summed.
+		
+		@rtype: array.array
+		@return: The summed-area table.
+		"""
+		width = self._occupancy_width
+		height = len(counts) / width
+		stride = width + 1
+		integral = array.array('i', [0]) * (stride * (height + 1))
+		for y in range(height):
+			row = y * width
+			above = y * stride + 1
+			below = above + stride
+			row_sum = 0
+			for x in range(width):
+				row_sum += counts[row + x]
+				integral[below + x] = integral[above + x] + row_sum
+		return integral
+		
+	def _createSpace(self, index):
+		"""
+		Builds the space at the specified index and stores it in this field.
+		
+		@type index: int
+		@param index: The index of the space within getAllSpaces().
+		
+		@rtype: Space
+		@return: The new space.
 		"""
-		arc = []
-		for i in range(sense_range): #Go 'til the start of the next axis.
-			space = self.getSpace((x, y))
-			if space:
-				arc.append(space)
-			x += x_offset
-			y += y_offset
-		return arc
+		width = self._dimensions[0]
+		space = self._pool[index] = Space(self, index, (index % width, index / width))
+		return space
 		
+	def _diffusePheromones(self, fraction):
+		"""
+		Spreads a share of every pheromone's strength evenly into the eight
+		spaces around it. Shares that would enter a wall or sponge, or leave the
+		field, are absorbed. Like pheromones gain whatever spreads into their
+		spaces; elsewhere, a new pheromone forms if enough arrives for it to be
+		smelled. Pheromones left too weak to be smelled disperse.
 		
+		@type fraction: float
+		@param fraction: The share of each pheromone's strength that spreads.
+		
+		@rtype: int
+		@return: The number of pheromones affected.
+		"""
+		neighbours = self._neighbours
+		sponges = shared.TERRAIN.getSponges()
+		pheromones = self._pheromones
+		gains = {}
+		for (index, buckets) in pheromones.iteritems():
+			base = index * 8
+			for (key, bucket) in buckets.iteritems():
+				share = bucket[0].getIntensity() * fraction / 8
+				for direction in DIRECTIONS:
+					neighbour = neighbours[base + direction]
+					if neighbour >= 0 and not sponges[neighbour]:
+						gain = gains.get(neighbour)
+						if gain is None:
+							gains[neighbour] = {key: share}
+						else:
+							gain[key] = gain.get(key, 0.0) + share
+							
+		kept = 1 - fraction
+		affected = 0
+		dispersed = []
+		for (index, buckets) in pheromones.iteritems():
+			gain = gains.get(index, {})
+			for (key, bucket) in buckets.iteritems():
+				if bucket[0].spread(kept, gain.pop(key, 0.0)):
+					self._recordPheromone(bucket[0])
+				else:
+					dispersed.append(bucket[0])
+				affected += 1
+		for pheromone in dispersed: #Removed only once the buckets are no longer being walked.
+			self._dispersePheromone(pheromone)
+			
+		width = self._dimensions[0]
+		for (index, gain) in gains.iteritems():
+			for (key, amount) in gain.iteritems():
+				if amount >= 1: #Anything weaker could never be smelled.
+					pheromone = inerts.Pheromone(key[0], key[1], amount, (index % width, index / width))
+					pheromones.setdefault(index, {})[key] = [pheromone]
+					self._recordPheromone(pheromone)
+					affected += 1
+		return affected
+		
+	def _dispersePheromone(self, pheromone):
+		"""
+		Disperses a pheromone and removes it from this field.
+		
+		@type pheromone: inerts.Pheromone
+		@param pheromone: The pheromone to be removed.
+		
+		@return: Nothing.
+		"""
+		pheromone.disperse()
+		self._pyramid.removePheromone(pheromone)
+		(x, y) = pheromone.getPosition()
+		index = y * self._dimensions[0] + x
+		buckets = self._pheromones[index]
+		del buckets[(pheromone.getType(), pheromone.getColony())]
+		if not buckets:
+			del self._pheromones[index]
+			
+	def _evictPheromones(self, count):
+		"""
+		Disperses the weakest pheromones in this field ahead of their time.
+		
+		Every pheromone decays at the same rate, so the weakest are those due to
+		disperse soonest, which are found at the front of the expiry heap;
+		pheromones due on the same tick are within one tick's decay of each
+		other. Pheromones that never decay are only evicted once no others
+		remain, weakest first.
+		
+		@type count: int
+		@param count: The number of pheromones to be evicted.
+		
+		@rtype: int
+		@return: The number of pheromones evicted.
+		"""
+		expiry = self._expiry
+		evicted = 0
+		while evicted < count and expiry:
+			(tick, pheromone) = heapq.heappop(expiry)
+			if pheromone.exists() and pheromone.getExpiry() == tick:
+				self._dispersePheromone(pheromone)
+				evicted += 1
+				
+		if evicted < count:
+			pheromones = [(pheromone.getIntensity(), pheromone) for pheromone in self.getPheromones()]
+			pheromones.sort()
+			for (intensity, pheromone) in pheromones[:count - evicted]:
+				self._dispersePheromone(pheromone)
+				evicted += 1
+		return evicted
+		
+	def _getSpacesAt(self, indices):
+		"""
+		Returns the spaces at the specified indices, creating any that do not
+		yet exist.
+		
+		@type indices: sequence
+		@param indices: The indices of the spaces within getAllSpaces().
+		
+		@rtype: list
+		@return: The requested spaces, in the order of their indices.
+		"""
+		pool = self._pool
+		spaces = []
+		for index in indices:
+			spaces.append(pool[index] or self._createSpace(index))
+		return spaces
+		
+	def _recordPheromone(self, pheromone):
+		"""
+		Indexes a pheromone whose strength has been set, so that it can be
+		smelled and will be dispersed on time.
+		
+		@type pheromone: inerts.Pheromone
+		@param pheromone: The pheromone to be indexed.
+		
+		@return: Nothing.
+		"""
+		self._pyramid.addPheromone(pheromone)
+		tick = pheromone.getExpiry()
+		if tick is not None:
+			heapq.heappush(self._expiry, (tick, pheromone))
+			
+			
 class Space(object):
 	"""
 	A space within a Field. These contain information about the state of the
 	system.
+	
+	Spaces are kept compact because a field may hold millions of them: they
+	have no instance dictionaries, their collections are only built when
+	something is added to them, and their neighbourhoods are looked up in a
+	table shared by every field of the same size.
+	
+	Agents, objects and pheromones are kept in buckets keyed by (type, colony)
+	as they are added, so queries pick out the buckets they need rather than
+	filtering everything held in the space.
 	"""
-	_pheromones = None #: A list of all signals in this space.
-	_pheromone_pool = None #:  dictionary used to gather pheromone data.
-	_agents = None #: A list of all agents currently occupying this space.
-	_objects = None #: A list of all inert objects occupying this space.
-	_neighbourhood = None #: A list of neighbours in the Moore neighbourhood, arranged in clockwise fashion, starting at the top centre.
-	_position = None #: The (x, y) position of this space in the field.
-	_field = None #: The Field to which this space belongs.
+	__slots__ = (
+	 '_deposits', #: The strength of the pheromones deposited in this space while its field is current, as [strongest, sum of the rest] slots keyed by (type, colony), or None if there are none.
+	 '_agents', #: All agents currently occupying this space, bucketed by (type, colony), or None if there are none.
+	 '_objects', #: All inert objects occupying this space, bucketed by (type, colony), or None if there are none.
+	 '_index', #: The index of this space within its field's getAllSpaces().
+	 '_position', #: The (x, y) position of this space in the field.
+	 '_field', #: The Field to which this space belongs.
+	)
 	
-	def __init__(self):
+	def __init__(self, field, index, position):
 		"""
 		Creates a new Space instance.
+		
+		@type field: Field
+		@param field: The field to which this Space belongs.
+		@type index: int
+		@param index: The index of this Space within the field's getAllSpaces().
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of this Space.
 		"""
-		self._pheromone_pool = {}
-		self._agents = []
-		self._objects = []
-		self._pheromones = []
+		self._field = field
+		self._index = index
+		self._position = position
+		self._deposits = self._agents = self._objects = None
 		
 	def addAgent(self, agent):
 		"""
@@ -360,8 +905,17 @@ class Space(object):
 		
 		@return: Nothing.
 		"""
-		self._agents.append(agent)
-		
+		key = (type(agent), agent.getColony())
+		self._field.countAgent(key, self._position)
+		if self._agents is None:
+			self._agents = {key: [agent]}
+		else:
+			bucket = self._agents.get(key)
+			if bucket is None:
+				self._agents[key] = [agent]
+			else:
+				bucket.append(agent)
+			
 	def addObject(self, obj):
 		"""
 		Adds an object to this space.
@@ -371,11 +925,23 @@ class Space(object):
 		
 		@return: Nothing.
 		"""
-		self._objects.append(obj)
+		key = (type(obj), obj.getColony())
+		if self._objects is None:
+			self._objects = {key: [obj]}
+		else:
+			bucket = self._objects.get(key)
+			if bucket is None:
+				self._objects[key] = [obj]
+			else:
+				bucket.append(obj)
 		
 	def addPheromone(self, pheromone_type, pheromone_colony, pheromone_intensity):
 		"""
-		Creates a new pheromone and adds it to this space.
+		Deposits a pheromone in this space.
+		
+		No pheromone is created here: deposits only accumulate into a slot for
+		their type and colony, which sumPheromones() later merges into the
+		pheromone already in this space, so busy trails allocate nothing.
 		
 		@type pheromone_type: int
 		@param pheromone_type: A signal enumeration constant denoting the type of
@@ -384,11 +950,25 @@ class Space(object):
 		@param pheromone_colony: The colony with which the pheromone is
 		    associated, or None if it is associated with threats.
 		@type pheromone_intensity: number
-		@param pheromone_intensity: The strength of the pheromone being created.
+		@param pheromone_intensity: The strength of the pheromone being
+		    deposited.
 		
 		@return: Nothing.
 		"""
-		self.setPheromone(inerts.Pheromone(pheromone_type, pheromone_colony, pheromone_intensity, self._position))
+		key = (pheromone_type, pheromone_colony)
+		if self._deposits is None:
+			self._field.markScented(self._index)
+			self._deposits = {key: [pheromone_intensity, 0.0]}
+			return
+			
+		slot = self._deposits.get(key)
+		if slot is None:
+			self._deposits[key] = [pheromone_intensity, 0.0]
+		elif pheromone_intensity > slot[0]:
+			slot[1] += slot[0]
+			slot[0] = pheromone_intensity
+		else:
+			slot[1] += pheromone_intensity
 		
 	def calcDistance(self, position):
 		"""
@@ -401,7 +981,7 @@ class Space(object):
 		"""
 		return calcDistance(self._position, position)
 		
-	def getAgents(self, types=None, colony=None):
+	def getAgents(self, types=None, colony=None, invert_colony=False):
 		"""
 		Returns all agents in this space that match the specified criteria.
 		
@@ -411,27 +991,41 @@ class Space(object):
 		@type colony: colony.Colony
 		@param colony: The colony by which the query should be filtered. If not
 		    specified, all colonies will be considered valid.
+		@type invert_colony: bool
+		@param invert_colony: True if all colonies other than the one specified
+		    should be returned.
 		
 		@rtype: list
 		@return: A list of all agents in this space that match the specified
 		    criteria.
 		"""
-		agents_l = self._agents[:]
-		if types:
-			agents_l = [agent for agent in agents_l if type(agent) in types]
-		if colony:
-			agents_l = [agent for agent in agents_l if agent.getColony() == colony]
+		if not self._agents:
+			return []
 			
+		if colony and invert_colony:
+			agents_l = _gatherBuckets(self._agents, types, None, colony)
+		else:
+			agents_l = _gatherBuckets(self._agents, types, colony and (colony,))
 		return [agent for agent in agents_l if agent.isVisible()]
 		
+	def getIndex(self):
+		"""
+		Indicates the index of this space within its field's getAllSpaces().
+		
+		@rtype: int
+		@return: The index of this space.
+		"""
+		return self._index
+		
 	def getMoore(self):
 		"""
-		Returns all spaces immediately surrounding this space.
+		Returns all spaces immediately surrounding this space, arranged in
+		clockwise fashion, starting at the top centre.
 		
 		@rtype: list
 		@return: A list of the requested spaces.
 		"""
-		return [space for space in self._neighbourhood if space]
+		return self._field.getNeighbours(self._index)
 		
 	def getMooreNoOverlap(self):
 		"""
@@ -440,7 +1034,7 @@ class Space(object):
 		@rtype: list
 		@return: A list of the requested spaces.
 		"""
-		return [space for (i, space) in enumerate(self._neighbourhood) if space and i % 2]
+		return self._field.getNeighbours(self._index, (1, 3, 5, 7))
 		
 	def getObjects(self, types=None, colony=None):
 		"""
@@ -456,14 +1050,13 @@ class Space(object):
 		@rtype: list
 		@return: A list of all objects in this space that match the specified
 		    criteria.
+		
+		Caution:: When only one bucket matches, it is returned directly rather
+		than copied; do not modify the list.
 		"""
-		objects = self._objects[:]
-		if types:
-			objects = [obj for obj in objects if type(obj) in types]
-		if colony:
-			objects = [obj for obj in objects if obj.getColony() == colony]
-			
-		return objects
+		if not self._objects:
+			return []
+		return _gatherBuckets(self._objects, types, colony and (colony,))
 		
 	def getPheromones(self, types=None, colony=None):
 		"""
@@ -478,15 +1071,15 @@ class Space(object):
 		
 		@rtype: list
 		@return: A list of all pheromones in this space that match the specified
-		    criteria.
+		    criteria. Pheromones associated with threats match every colony.
+		
+		Caution:: When only one bucket matches, it is returned directly rather
+		than copied; do not modify the list.
 		"""
-		pheromones = self._pheromones[:]
-		if types:
-			pheromones = [pheromone for pheromone in pheromones if pheromone.getType() in types]
-		if colony:
-			pheromones = [pheromone for pheromone in pheromones if not pheromone.getColony() or pheromone.getColony() == colony]
-			
-		return pheromones
+		buckets = self._field.getPheromoneBuckets(self._index)
+		if not buckets:
+			return []
+		return _gatherBuckets(buckets, types, colony and (colony, None))
 		
 	def getPosition(self):
 		"""
@@ -504,32 +1097,7 @@ class Space(object):
 		@rtype: list
 		@return: A list of the requested spaces.
 		"""
-		return [space for (i, space) in enumerate(self._neighbourhood) if space and not i % 2]
-		
-	def initialize(self, field, position):
-		"""
-		Once every space in a field has been constructed, this function is used
-		to build neighbourhood mappings.
-		
-		@type field: Field
-		@param field: The field to which this Space belongs.
-		@type position: tuple
-		@param position: The (x, y) co-ordinates of this Space.
-		
-		@return: Nothing.
-		"""
-		self._position = (x, y) = position
-		self._neighbourhood = (
-		 field.getSpace((x, y - 1)),
-		 field.getSpace((x + 1, y - 1)),
-		 field.getSpace((x + 1, y)),
-		 field.getSpace((x + 1, y + 1)),
-		 field.getSpace((x, y + 1)),
-		 field.getSpace((x - 1, y + 1)),
-		 field.getSpace((x - 1, y)),
-		 field.getSpace((x - 1, y - 1))
-		)
-		self._field = field
+		return self._field.getNeighbours(self._index, (0, 2, 4, 6))
 		
 	def isOpen(self, pheromone=False):
 		"""
@@ -546,47 +1114,267 @@ class Space(object):
 			return not self.getObjects((inerts.Sponge, inerts.Wall))
 		return not self.getObjects((inerts.Wall,))
 		
-	def setPheromone(self, pheromone):
+	def sumPheromones(self, pheromones):
+		"""
+		Combines the pheromones deposited in this space with the like
+		pheromones already here, applying a linear stacking effect and reducing
+		the number of things the system needs to keep track of.
+		
+		A pheromone already here absorbs the deposits in place and keeps its
+		identity, so agents following it are not disturbed; a new pheromone is
+		only created for a type and colony that this space does not yet hold.
+		Deposits were made on the previous tick, so they have decayed once by
+		the time they are combined, and new pheromones are dated from then.
+		
+		@type pheromones: dict
+		@param pheromones: The pheromones already in this space, as returned by
+		    Field.getPheromoneBuckets(); it is updated in place.
+		
+		@rtype: list
+		@return: The pheromones that absorbed the deposits.
+		"""
+		if self._deposits is None:
+			return []
+			
+		factor = ENVIRONMENT.SIGNALS_DISPERSION_FACTOR
+		leads = []
+		for (key, (strongest, rest)) in self._deposits.iteritems():
+			existing = pheromones.get(key)
+			if existing:
+				lead_pheromone = existing[0]
+				lead_pheromone.absorbDeposits(strongest * factor, rest * factor)
+			else:
+				lead_pheromone = inerts.Pheromone(key[0], key[1], strongest, self._position, shared.CLOCK - 1)
+				if rest:
+					lead_pheromone.boostIntensity(rest * factor)
+				pheromones[key] = [lead_pheromone]
+			leads.append(lead_pheromone)
+		self._deposits = None
+		return leads
+		
+		
+class PheromonePyramid(object):
+	"""
+	Upper bounds on the intensity of the pheromones of each (type, colony)
+	within square blocks of the field, at several resolutions.
+	
+	Level 0 divides the field into blocks of PYRAMID_BLOCK spaces; each
+	further level merges four blocks of the level below, until one block
+	covers everything. Searches skip every block whose bound, taken at the
+	block's nearest point, could not be smelled, so a large sense of smell
+	costs little more than a small one.
+	
+	Every pheromone decays at the same rate, so bounds are stored relative to
+	a reference tick and decay along with the pheromones beneath them. They
+	are raised whenever a pheromone is added, and recomputed only when a
+	block of level 0 empties, so they may overestimate.
+	"""
+	_dimensions = None #: The (width, height) dimensions of the field.
+	_levels = None #: The (width, height) dimensions, in blocks, of each level.
+	_bounds = None #: For each (type, colony), a list holding the array of bounds for each level, as of _reference.
+	_members = None #: For each (type, colony), a dictionary that maps the index of each non-empty block of level 0 to a dictionary of its pheromones, keyed by their (x, y) co-ordinates.
+	_reference = 0 #: The tick as of which the bounds are expressed.
+	_count = 0 #: The number of pheromones recorded and not yet dispersed.
+	
+	def __init__(self, dimensions):
+		"""
+		Creates a new, empty PheromonePyramid.
+		
+		@type dimensions: tuple
+		@param dimensions: The (width, height) dimensions of the field.
+		"""
+		self._dimensions = (width, height) = dimensions
+		self._levels = []
+		size = PYRAMID_BLOCK
+		while True:
+			level = ((width + size - 1) / size, (height + size - 1) / size)
+			self._levels.append(level)
+			if level == (1, 1):
+				break
+			size *= 2
+		self._bounds = {}
+		self._members = {}
+		self._reference = shared.CLOCK
+		
+	def addPheromone(self, pheromone):
 		"""
-		Places a pheromone into this space.
+		Records a pheromone that has been deposited or joined, replacing any
+		like pheromone in the same space.
 		
 		@type pheromone: inerts.Pheromone
-		@param pheromone: The pheromone to be added.
+		@param pheromone: The pheromone to be recorded.
 		
 		@return: Nothing.
 		"""
-		colony = self._pheromone_pool.get(pheromone.getColony())
-		if colony is None:
-			colony = {}
-			self._pheromone_pool[pheromone.getColony()] = colony
+		key = (pheromone.getType(), pheromone.getColony())
+		bounds = self._bounds.get(key)
+		if bounds is None:
+			bounds = self._bounds[key] = [array.array('d', [0.0]) * (w * h) for (w, h) in self._levels]
+			self._members[key] = {}
 			
-		type = self._pheromone_pool.get(pheromone.getType())
-		if type is None:
-			type = []
-			colony[pheromone.getType()] = type
+		(x, y) = pheromone.getPosition()
+		x /= PYRAMID_BLOCK
+		y /= PYRAMID_BLOCK
+		block = y * self._levels[0][0] + x
+		members = self._members[key].setdefault(block, {})
+		if not members.has_key(pheromone.getPosition()):
+			self._count += 1
+		members[pheromone.getPosition()] = pheromone
+		
+		bound = pheromone.getIntensity() / self._getScale() * 1.000001 #Rounding must never leave a bound below its pheromones.
+		for (level, (width, height)) in enumerate(self._levels):
+			index = y * width + x
+			if bounds[level][index] >= bound: #Every block above is at least as high.
+				break
+			bounds[level][index] = bound
+			x /= 2
+			y /= 2
 			
-		type.append(pheromone)
+	def countPheromones(self):
+		"""
+		Indicates how many pheromones are recorded.
 		
-	def sumPheromones(self):
+		@rtype: int
+		@return: The number of pheromones recorded and not yet dispersed.
 		"""
-		Combines like pheromones into a single pheromone within this space,
-		applying a linear stacking effect and reducing the number of things the
-		system needs to keep track of.
+		return self._count
 		
-		@return: Nothing.
+	def gatherKey(self, position, smell, key, threshold):
+		"""
+		Finds every pheromone of one type and colony whose perceived intensity
+		at a position exceeds a threshold, without regard for walls or sponges.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the observer.
+		@type smell: int
+		@param smell: The observer's sense of smell; see calcInverseSquare().
+		@type key: tuple
+		@param key: The (type, colony) of the pheromones of interest.
+		@type threshold: number
+		@param threshold: The perceived intensity that must be exceeded.
+		
+		@rtype: list
+		@return: (perceived intensity, pheromone) pairs, in no particular
+		    order.
 		"""
-		self._pheromones = []
-		for (colony, types) in self._pheromone_pool.iteritems():
-			for (type, pheromones) in types.iteritems():
-				pheromones = [(pheromone.getIntensity(), pheromone) for pheromone in pheromones]
-				pheromones.sort()
+		bounds = self._bounds.get(key)
+		if bounds is None:
+			return []
+			
+		scale = self._getScale()
+		members = self._members[key]
+		found = []
+		blocks = [(len(self._levels) - 1, 0, 0)]
+		while blocks:
+			(level, x, y) = blocks.pop()
+			(width, height) = self._levels[level]
+			if not (x < width and y < height) or not bounds[level][y * width + x]:
+				continue
 				
-				lead_pheromone = pheromones[-1][1]
-				for pheromone in pheromones[:-1]:
-					lead_pheromone.boostIntensity(pheromone[1].disperse())
-				self._pheromones.append(lead_pheromone)
-				self._field.addPheromone(lead_pheromone)
-		self._pheromone_pool = None
+			size = PYRAMID_BLOCK << level
+			if calcInverseSquare(_calcBlockDistance(position, x * size, y * size, size), smell, bounds[level][y * width + x] * scale) <= threshold:
+				continue
+				
+			if level:
+				level -= 1
+				x *= 2
+				y *= 2
+				blocks += [(level, x, y), (level, x + 1, y), (level, x, y + 1), (level, x + 1, y + 1)]
+			else:
+				for pheromone in members.get(y * width + x, {}).itervalues():
+					intensity = calcInverseSquare(calcDistance(position, pheromone.getPosition()), smell, pheromone.getIntensity())
+					if intensity > threshold:
+						found.append((intensity, pheromone))
+		return found
+		
+	def getKeys(self):
+		"""
+		Lists the kinds of pheromone that have been recorded.
+		
+		@rtype: list
+		@return: The (type, colony) of every kind of pheromone recorded so far,
+		    including kinds that have since dispersed.
+		"""
+		return self._bounds.keys()
+		
+	def getPheromones(self, key):
+		"""
+		Lists the pheromones of one type and colony that have been recorded and
+		not yet dispersed.
+		
+		@type key: tuple
+		@param key: The (type, colony) of the pheromones of interest.
+		
+		@rtype: list
+		@return: The matching pheromones, in no particular order.
+		"""
+		pheromones = []
+		for block in self._members.get(key, {}).itervalues():
+			pheromones += block.values()
+		return pheromones
+		
+	def removePheromone(self, pheromone):
+		"""
+		Forgets a pheromone that has dispersed.
+		
+		@type pheromone: inerts.Pheromone
+		@param pheromone: The pheromone to be forgotten.
+		
+		@return: Nothing.
+		"""
+		key = (pheromone.getType(), pheromone.getColony())
+		(x, y) = pheromone.getPosition()
+		x /= PYRAMID_BLOCK
+		y /= PYRAMID_BLOCK
+		width = self._levels[0][0]
+		block = y * width + x
+		members = self._members[key]
+		pheromones = members[block]
+		if not pheromones.get(pheromone.getPosition()) is pheromone: #Already replaced.
+			return
+		del pheromones[pheromone.getPosition()]
+		self._count -= 1
+		if pheromones:
+			return
+			
+		#The block is empty, so its bound, and possibly those above it, fall.
+		del members[block]
+		bounds = self._bounds[key]
+		bounds[0][block] = 0.0
+		for level in range(1, len(self._levels)):
+			(child_width, child_height) = self._levels[level - 1]
+			x /= 2
+			y /= 2
+			bound = 0.0
+			for c_y in (y * 2, y * 2 + 1):
+				for c_x in (x * 2, x * 2 + 1):
+					if c_x < child_width and c_y < child_height:
+						bound = max(bound, bounds[level - 1][c_y * child_width + c_x])
+			index = y * self._levels[level][0] + x
+			if bounds[level][index] == bound:
+				break
+			bounds[level][index] = bound
+			
+	def _getScale(self):
+		"""
+		Determines how far pheromones have decayed since the bounds' reference
+		tick, rebasing the bounds onto the current tick if the factor has grown
+		too small or too large to be represented accurately.
+		
+		@rtype: float
+		@return: The factor by which stored bounds must be multiplied.
+		"""
+		factor = ENVIRONMENT.SIGNALS_DISPERSION_FACTOR
+		scale = float(factor) ** (shared.CLOCK - self._reference)
+		if 1e-100 < scale < 1e100:
+			return scale
+			
+		for bounds in self._bounds.values():
+			for level in bounds:
+				for i in range(len(level)):
+					level[i] *= scale
+		self._reference = shared.CLOCK
+		return 1.0
 		
 		
 def calcDistance(p1, p2):
@@ -653,6 +1441,9 @@ def findAngle(start, end):
 	Note:: Older versions of this algorithm worked in terms of floating-point
 	values. Integers will now be returned because they are faster.
 	
+	Note:: Angles depend only on the offset between the two positions, so each
+	one is computed once and cached.
+	
 	@type start: tuple
 	@param start: The (x, y) co-ordinates of the starting location.
 	@type end: tuple
@@ -661,27 +1452,47 @@ def findAngle(start, end):
 	@rtype: int
 	@return: The angle between the two positions, with up being 0.
 	"""
-	(x1, y1) = start
-	(x2, y2) = end
-	adjacent = x2 - x1 
-	opposite = y2 - y1
-	
-	if adjacent == 0:
-		if opposite > 0:
-			return 180
-		else:
-			return 0
-	if opposite == 0:
-		if adjacent > 0:
-			return 90
+	offset = (end[0] - start[0], end[1] - start[1])
+	angle = _ANGLES.get(offset)
+	if angle is None:
+		(adjacent, opposite) = offset
+		if adjacent == 0:
+			if opposite > 0:
+				angle = 180
+			else:
+				angle = 0
+		elif opposite == 0:
+			if adjacent > 0:
+				angle = 90
+			else:
+				angle = 270
 		else:
-			return 270
-			
-	#Did away with floating point math to increase speed at the cost of a tiny amount of accuracy. (Insignificant)
-	angle = int((90 + math.degrees(math.atan(float(opposite) / adjacent))))
-	if adjacent < 0:
-		angle += 180
-	return angle % 360
+			#Did away with floating point math to increase speed at the cost of a tiny amount of accuracy. (Insignificant)
+			angle = int((90 + math.degrees(math.atan(float(opposite) / adjacent))))
+			if adjacent < 0:
+				angle += 180
+			angle %= 360
+		_ANGLES[offset] = angle
+	return angle
+	
+def findDirection(start, end):
+	"""
+	Determines the direction in which an agent would step to travel from one
+	position towards another.
+	
+	@type start: tuple
+	@param start: The (x, y) co-ordinates of the starting location.
+	@type end: tuple
+	@param start: The (x, y) co-ordinates of the ending location.
+	
+	@rtype: int
+	@return: The index of the direction in DIRECTIONS.
+	"""
+	offset = (end[0] - start[0], end[1] - start[1])
+	direction = _GOAL_DIRECTIONS.get(offset)
+	if direction is None:
+		direction = _GOAL_DIRECTIONS[offset] = ANGLE_DIRECTIONS[findAngle(start, end)]
+	return direction
 	
 def findClosestEntity(start, entities):
 	"""
@@ -713,6 +1524,148 @@ def findClosestEntity(start, entities):
 			
 	return (position, entity)
 	
+def getSenseOffsets(sense_range):
+	"""
+	Returns the offsets that make up a sense range, building and caching them
+	if necessary.
+	
+	@type sense_range: int
+	@param sense_range: The distance limiter.
+	
+	@rtype: tuple
+	@return: A collection of (x, y) offsets, in the order in which the spaces
+	    they lead to are reported by Field.getSpaceIndices().
+	"""
+	offsets = _SENSE_OFFSETS.get(sense_range)
+	if offsets is None:
+		if sense_range == 1: #The Moore neighbourhood, orthogonals first.
+			offsets = [DIRECTION_OFFSETS[i] for i in (0, 2, 4, 6, 1, 3, 5, 7)]
+		else: #A diamond, built as four arcs per radius.
+			offsets = [(0, 0)]
+			for i in range(1, sense_range + 1):
+				offsets += [(j, j - i) for j in range(i)]
+				offsets += [(i - j, j) for j in range(i)]
+				offsets += [(-j, i - j) for j in range(i)]
+				offsets += [(j - i, -j) for j in range(i)]
+		offsets = [(calcDistance((0, 0), offset), i, offset) for (i, offset) in enumerate(offsets)]
+		offsets.sort() #2.3 is limited. :(
+		offsets = _SENSE_OFFSETS[sense_range] = tuple([offset for (distance, i, offset) in offsets])
+	return offsets
+	
+def _calcBlockDistance(position, x, y, size):
+	"""
+	Determines the shortest distance, as calcDistance() measures it, from a
+	position to any space within a square block.
+	
+	@type position: tuple
+	@param position: The (x, y) co-ordinates of the observer.
+	@type x: int
+	@param x: The x co-ordinate of the block's top-left space.
+	@type y: int
+	@param y: The y co-ordinate of the block's top-left space.
+	@type size: int
+	@param size: The width and height of the block.
+	
+	@rtype: int
+	@return: The distance to the block's nearest space.
+	"""
+	(p_x, p_y) = position
+	return calcDistance((0, 0), (max(0, x - p_x, p_x - (x + size - 1)), max(0, y - p_y, p_y - (y + size - 1))))
+	
+def _gatherBuckets(buckets, types=None, colonies=None, excluded_colony=None):
+	"""
+	Collects the contents of every (type, colony) bucket that matches a query.
+	
+	@type buckets: dict
+	@param buckets: The lists of entities held by a Space, keyed by
+	    (type, colony).
+	@type types: sequence
+	@param types: The types to be collected, or None if all types are valid.
+	@type colonies: sequence
+	@param colonies: The colonies to be collected, or None if all colonies are
+	    valid.
+	@type excluded_colony: colony.Colony
+	@param excluded_colony: A colony whose buckets should be skipped, or None.
+	
+	@rtype: list
+	@return: The entities in all matching buckets.
+	
+	Caution:: When only one bucket matches, it is returned directly rather than
+	copied.
+	"""
+	if types and colonies:
+		matches = []
+		for entity_type in types:
+			for colony in colonies:
+				bucket = buckets.get((entity_type, colony))
+				if bucket:
+					matches.append(bucket)
+	else:
+		matches = [bucket for ((entity_type, colony), bucket) in buckets.iteritems() if
+		 (not types or entity_type in types) and
+		 (not colonies or colony in colonies) and
+		 (excluded_colony is None or not colony is excluded_colony)
+		]
+		
+	if not matches:
+		return []
+	elif len(matches) == 1:
+		return matches[0]
+		
+	gathered = []
+	for bucket in matches:
+		gathered += bucket
+	return gathered
+	
+def _getSenseTable(sense_range, width):
+	"""
+	Returns the table of offsets that make up a sense range, as applied to a
+	field of the specified width, building and caching it if necessary.
+	
+	@type sense_range: int
+	@param sense_range: The distance limiter.
+	@type width: int
+	@param width: The width of the field to which the offsets will be applied.
+	
+	@rtype: tuple
+	@return: A collection of (x offset, y offset, flat offset) tuples, ordered by
+	    increasing distance.
+	"""
+	table = _SENSE_TABLES.get((sense_range, width))
+	if table is None:
+		table = _SENSE_TABLES[(sense_range, width)] = tuple([(x, y, y * width + x) for (x, y) in getSenseOffsets(sense_range)])
+	return table
+	
+def _getNeighbourTable(dimensions):
+	"""
+	Returns the neighbour-index table for fields of the specified size,
+	building and caching it if necessary.
+	
+	The table is flat: the index of the neighbour in direction d of the space at
+	index i is found at position i * 8 + d, with -1 marking neighbours that lie
+	outside of the field.
+	
+	@type dimensions: tuple
+	@param dimensions: The (width, height) dimensions of the field.
+	
+	@rtype: array.array
+	@return: The requested table.
+	"""
+	table = _NEIGHBOUR_TABLES.get(dimensions)
+	if table is None:
+		(width, height) = dimensions
+		table = array.array('i')
+		for y in range(height):
+			for x in range(width):
+				for (x_offset, y_offset) in DIRECTION_OFFSETS:
+					(n_x, n_y) = (x + x_offset, y + y_offset)
+					if 0 <= n_x < width and 0 <= n_y < height:
+						table.append(n_y * width + n_x)
+					else:
+						table.append(-1)
+		_NEIGHBOUR_TABLES[dimensions] = table
+	return table
+	
 def nextPositionByAngle(start, angle):
 	"""
 	Determines the co-ordinates of the next position that would be reached if
@@ -731,25 +1684,25 @@ def nextPositionByAngle(start, angle):
 	@rtype: tuple
 	@return: The (x, y) co-ordinates of the next position that would be reached.
 	"""
-	(x, y) = start
-	angle = angle
-	
-	if angle <= 22 or angle > 337:
-		return (x, y - 1)
-	if 22 < angle <= 67:
-		return (x + 1, y - 1)
-	if 67 < angle <= 112:
-		return (x + 1, y)
-	if 112 < angle <= 157:
-		return (x + 1, y + 1)
-	if 157 < angle <= 202:
-		return (x, y + 1)
-	if 202 < angle <= 247:
-		return (x - 1, y + 1)
-	if 247 < angle <= 292:
-		return (x - 1, y)
-	if 292 < angle <= 337:
-		return (x - 1, y - 1)
+	if not type(angle) is int:
+		angle = int(math.ceil(angle))
+	return nextPositionByDirection(start, ANGLE_DIRECTIONS[angle % 360])
+	
+def nextPositionByDirection(start, direction):
+	"""
+	Determines the co-ordinates of the next position that would be reached if
+	an agent were to advance in the given direction.
+	
+	@type start: tuple
+	@param start: The (x, y) co-ordinates of the starting location.
+	@type direction: int
+	@param direction: The index of the direction in DIRECTIONS.
+	
+	@rtype: tuple
+	@return: The (x, y) co-ordinates of the next position that would be reached.
+	"""
+	(x_offset, y_offset) = DIRECTION_OFFSETS[direction]
+	return (start[0] + x_offset, start[1] + y_offset)
 	
 def nextPositionByGoal(start, end):
 	"""
@@ -765,5 +1718,5 @@ def nextPositionByGoal(start, end):
 	"""
 	if start == end:
 		return end
-	return nextPositionByAngle(start, findAngle(start, end))
+	return nextPositionByDirection(start, findDirection(start, end))
 	
@@ -16,6 +16,8 @@ environment = {
  
  #Pathfinding
  'wander_variance': 0.1, #The probability that an agent will deviate from its current heading with each step.
+ 'pathfinding_chunks': 0, #If greater than 0, unts find their way home through square chunks of the field this many spaces wide, searching only the chunks they pass through; routes may be a few steps longer, but very large fields become practical. Otherwise, a route map covering the whole field is built for every colony.
+ 'resource_map': False, #If True, workers and architects find resources through a map that is only rebuilt when walls or resources change, rather than by searching their sight every tick. This is much faster, but a little less precise near the ends of walls.
  
  #Reproduction
  'generation_minimum': 0.25, #A new brood must be at least this big, relative to the previous one, for reproduction to occur; used to prevent waste.
@@ -28,6 +30,8 @@ environment = {
  #Note: Increasing these values will result in better swarm logic, but more processing time will be required as they linger longer.
  'signals_dispersion_factor': 0.8, #How much of a pheromone persists after each cycle.
  'signals_collision_factor': 0.25, #How effectively like pheromones stack.
+ 'signals_diffusion': 0.0, #The share of each pheromone's strength that spreads evenly into the eight spaces around it every cycle, smoothing trails into gradients; whatever spreads into a wall or sponge, or off the field, is absorbed. 0 disables diffusion, which is much faster.
+ 'signals_budget': 0, #If greater than 0, no more than this many pheromones may exist at once; when there are more, the weakest are dispersed early. This puts a ceiling on the time spent on pheromones, at the cost of shorter trails.
  
  #Threats
  'kill_time_architect': 3, #How long a threat will idle after killing an architect.
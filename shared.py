@@ -2,36 +2,49 @@
 """
 Unts module: shared; contains common constants and variables.
 """
-import random
-import breve
-
-import environment
-
-RANDOMIZER = None #: A seeded random number generator.
-ENVIRONMENT = None #: The simulation environment rules.
+import random
+import breve
+
+import environment
+
+RANDOMIZER = None #: The seeded RandomStream from which all other random streams are derived.
+ENVIRONMENT = None #: The simulation environment rules.
 
 COLONIES = [] #: A list of all colonies in the system.
 THREATS = [] #: A list of all threats in the system.
 WALLS = [] #: A list of all obstacles in the system.
 RESOURCES = [] #: A list of all resources in the system.
 AGENTS = [] #: A list of all non-threat agents that the system needs to animate.
-
-BOLDNESS_PASSIVE = 1 #: An enumeration constant signifying passive behaviour.
-BOLDNESS_ASSERTIVE = 2 #: An enumeration constant signifying assertive behaviour.
-BOLDNESS_AGGRESSIVE = 3 #: An enumeration constant signifying aggressive behaviour.
-
-RESOURCE_FOOD = 1 #: An enumeration constant signifying food resources.
-RESOURCE_WATER = 2 #: An enumeration constant signifying water resources.
-SIGNAL_THREAT = 3 #: An enumeration constant signifying threat signals.
-
-STATUS_WANDERING = 1 #: An enumeration constant indicating that an agent is wandering.
-STATUS_FOLLOWING = 2 #: An enumeration constant indicating that an agent is following an entity.
-STATUS_KILLING = 4 #: An enumeration constant indicating that an agent is killing another agent.
-STATUS_RETREATING = 5 #: An enumeration constant indicating that an agent is escaping the scene of an attack.
-STATUS_BACKTRACKING = 6 #: An enumeration constant indicating that an agent is backing out of a dead end.
-STATUS_TRACING = 7 #: An enumeration constant indicating that an agent is trying to find a way around a wall by following pheromones.
-STATUS_DETOURING = 8 #: An enumeration constant indicating that an agent is trying to find a way around a wall.
-
+UNTS = None #: A Roster of all unts that are active on the field; resting unts are excluded.
+CENSUS = None #: A Census of the agents in AGENTS, bucketed by class and status.
+CLOCK = 0 #: The tick the simulation is on; pheromones decay against it.
+TERRAIN = None #: The terrain.Terrain that records where walls and sponges are; built once the field has been populated.
+
+BOLDNESS_PASSIVE = 1 #: An enumeration constant signifying passive behaviour.
+BOLDNESS_ASSERTIVE = 2 #: An enumeration constant signifying assertive behaviour.
+BOLDNESS_AGGRESSIVE = 3 #: An enumeration constant signifying aggressive behaviour.
+
+RESOURCE_FOOD = 1 #: An enumeration constant signifying food resources.
+RESOURCE_WATER = 2 #: An enumeration constant signifying water resources.
+SIGNAL_THREAT = 3 #: An enumeration constant signifying threat signals.
+
+STATUS_WANDERING = 1 #: An enumeration constant indicating that an agent is wandering.
+STATUS_FOLLOWING = 2 #: An enumeration constant indicating that an agent is following an entity.
+STATUS_KILLING = 4 #: An enumeration constant indicating that an agent is killing another agent.
+STATUS_RETREATING = 5 #: An enumeration constant indicating that an agent is escaping the scene of an attack.
+STATUS_BACKTRACKING = 6 #: An enumeration constant indicating that an agent is backing out of a dead end.
+STATUS_TRACING = 7 #: An enumeration constant indicating that an agent is trying to find a way around a wall by following pheromones.
+STATUS_DETOURING = 8 #: An enumeration constant indicating that an agent is trying to find a way around a wall.
+STATUS_NAMES = {
+ STATUS_WANDERING: 'wandering',
+ STATUS_FOLLOWING: 'following',
+ STATUS_KILLING: 'killing',
+ STATUS_RETREATING: 'retreating',
+ STATUS_BACKTRACKING: 'backtracking',
+ STATUS_TRACING: 'tracing',
+ STATUS_DETOURING: 'detouring',
+} #: A readable name for each status constant, used when reporting populations.
+
 def initialize(config_data):
 	"""
 	Reads data from seed.py and uses it to initialize global constants.
@@ -39,12 +52,225 @@ def initialize(config_data):
 	@type config_data: dict
 	@param config_data: A dictionary containing information about the simulation
 	    environment.
-	"""
-	global ENVIRONMENT
-	ENVIRONMENT = environment.Environment(config_data)
-	global RANDOMIZER
-	RANDOMIZER = random.Random(ENVIRONMENT.RANDOM_SEED)
+	"""
+	global ENVIRONMENT
+	ENVIRONMENT = environment.Environment(config_data)
+	global RANDOMIZER
+	RANDOMIZER = RandomStream(ENVIRONMENT.RANDOM_SEED)
+	global UNTS
+	UNTS = Roster()
+	global CENSUS
+	CENSUS = Census()
+	
+class Census(object):
+	"""
+	The agents in the system, bucketed by class and status.
+	
+	Agents are moved between buckets as their statuses change, so the number
+	of agents that share a behaviour can be reported without visiting every
+	agent.
+	"""
+	_buckets = None #: Dictionaries mapping the id() of each agent to the agent, keyed by (class, status).
+	
+	def __init__(self):
+		"""
+		Creates a new, empty Census.
+		"""
+		self._buckets = {}
+		
+	def add(self, agent, status):
+		"""
+		Records an agent.
+		
+		@type agent: agents.Agent
+		@param agent: The agent to be recorded.
+		@type status: int
+		@param status: The agent's current status.
+		
+		@return: Nothing.
+		"""
+		key = (type(agent), status)
+		bucket = self._buckets.get(key)
+		if bucket is None:
+			bucket = self._buckets[key] = {}
+		bucket[id(agent)] = agent
+		
+	def count(self, agent_type=None, status=None):
+		"""
+		Counts the recorded agents that match the specified criteria.
+		
+		@type agent_type: type
+		@param agent_type: The class of agent to be counted, or None if all
+		    are. Subclasses are not included.
+		@type status: int
+		@param status: The status of the agents to be counted, or None if all
+		    are.
+		
+		@rtype: int
+		@return: The number of matching agents.
+		"""
+		total = 0
+		for ((bucket_type, bucket_status), bucket) in self._buckets.iteritems():
+			if (agent_type is None or bucket_type is agent_type) and (status is None or bucket_status == status):
+				total += len(bucket)
+		return total
+		
+	def move(self, agent, old_status, new_status):
+		"""
+		Moves an agent to the bucket for its new status. Agents that were never
+		recorded, or that have been removed, are ignored.
+		
+		@type agent: agents.Agent
+		@param agent: The agent whose status has changed.
+		@type old_status: int
+		@param old_status: The agent's previous status.
+		@type new_status: int
+		@param new_status: The agent's new status.
+		
+		@return: Nothing.
+		"""
+		bucket = self._buckets.get((type(agent), old_status))
+		if bucket and bucket.has_key(id(agent)):
+			del bucket[id(agent)]
+			self.add(agent, new_status)
+			
+	def remove(self, agent, status):
+		"""
+		Forgets an agent.
+		
+		@type agent: agents.Agent
+		@param agent: The agent to be forgotten.
+		@type status: int
+		@param status: The agent's current status.
+		
+		@return: Nothing.
+		"""
+		bucket = self._buckets.get((type(agent), status))
+		if bucket and bucket.has_key(id(agent)):
+			del bucket[id(agent)]
+			
+	
+class RandomStream(random.Random):
+	"""
+	A deterministic random number generator that can derive independent
+	substreams.
 	
+	Every agent draws from its own substream, so the values it receives depend
+	only on its own history and not on where it falls in the turn order. This is
+	also what would allow agents to be processed in parallel.
+	"""
+	_key = None #: The hashable value from which this stream was seeded.
+	_spawned = 0 #: The number of anonymous substreams derived from this stream.
+	
+	def __init__(self, key=None):
+		"""
+		Creates a new RandomStream.
+		
+		@type key: hashable
+		@param key: The value from which this stream will be seeded; the system
+		    clock will be used if this is None.
+		"""
+		random.Random.__init__(self, key)
+		self._key = key
+		
+	def substream(self, key=None):
+		"""
+		Derives a new stream from this one. The new stream's values are unrelated
+		to this stream's, but they are fully determined by this stream's key and
+		the key provided. A stream seeded from the system clock has no key, so
+		its substreams are seeded from its own next value instead, which keeps
+		unseeded runs independent of one another.
+		
+		@type key: hashable
+		@param key: A value that identifies the new stream among this stream's
+		    substreams. If not specified, substreams are numbered in the order in
+		    which they are requested.
+		
+		@rtype: RandomStream
+		@return: The new stream.
+		"""
+		if key is None:
+			key = self._spawned
+			self._spawned += 1
+		if self._key is None:
+			return RandomStream((self.random(), key))
+		return RandomStream((self._key, key))
+		
+class Roster(object):
+	"""
+	An incrementally maintained collection of agents that act every tick.
+	
+	Removals are deferred until the next time the roster is shuffled, so agents
+	that leave mid-tick do not disturb the turn order of the tick in progress.
+	"""
+	_members = None #: The agents in this roster, in their most recent turn order.
+	_listed = None #: A dictionary mapping the id() of each listed agent to True while it remains active.
+	
+	def __init__(self):
+		"""
+		Creates a new, empty Roster.
+		"""
+		self._members = []
+		self._listed = {}
+		
+	def __len__(self):
+		return len(self._members)
+		
+	def add(self, agent):
+		"""
+		Adds an agent to this roster, if it is not already listed.
+		
+		@type agent: agents.Agent
+		@param agent: The agent to be added.
+		
+		@return: Nothing.
+		"""
+		key = id(agent)
+		if not key in self._listed:
+			self._members.append(agent)
+		self._listed[key] = True
+		
+	def remove(self, agent):
+		"""
+		Marks an agent for removal from this roster. The agent will be purged the
+		next time the roster is shuffled.
+		
+		@type agent: agents.Agent
+		@param agent: The agent to be removed.
+		
+		@return: Nothing.
+		"""
+		key = id(agent)
+		if key in self._listed:
+			self._listed[key] = False
+			
+	def shuffle(self, randomizer):
+		"""
+		Purges all agents marked for removal and randomizes the turn order of
+		those that remain.
+		
+		Caution:: The list returned is not a copy. Agents added after this call
+		are appended to it, so callers should take its length before iterating
+		if they do not want to visit them.
+		
+		@type randomizer: random.Random
+		@param randomizer: The generator used to determine the new turn order.
+		
+		@rtype: list
+		@return: The active agents, in their new turn order.
+		"""
+		listed = self._listed
+		members = []
+		for agent in self._members:
+			key = id(agent)
+			if listed[key]:
+				members.append(agent)
+			else:
+				del listed[key]
+		randomizer.shuffle(members)
+		self._members = members
+		return members
+		
 class Traceable(object):
 	"""
 	An abstract super-class for everything that can exist within a field in the
@@ -46,6 +46,7 @@ import colony
 import map
 import inerts
 import agents
+import terrain
 import time
 
 class System(breve.Control):
@@ -117,10 +118,32 @@ class System(breve.Control):
 			shared.WALLS.append(inerts.Wall(position))
 		for position in sponges:
 			shared.WALLS.append(inerts.Sponge(position))
+		shared.TERRAIN = terrain.Terrain((shared.ENVIRONMENT.FIELD_WIDTH, shared.ENVIRONMENT.FIELD_HEIGHT), shared.WALLS, shared.ENVIRONMENT.PATHFINDING_CHUNKS)
 			
 		#Create field
 		self._field = map.Field((shared.ENVIRONMENT.FIELD_WIDTH, shared.ENVIRONMENT.FIELD_HEIGHT))
 		
+	def addWall(self, position, sponge=False):
+		"""
+		Places a new wall on the field while the simulation is running; it will
+		be drawn from the next tick onwards.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates at which the wall will exist.
+		@type sponge: bool
+		@param sponge: True if a sponge, which only absorbs pheromones, should
+		    be placed instead.
+		
+		@rtype: inerts.BaseWall
+		@return: The new wall.
+		"""
+		if sponge:
+			wall = inerts.Sponge(position)
+		else:
+			wall = inerts.Wall(position)
+		self._refreshTerrain(position)
+		return wall
+		
 	def iterate(self):
 		"""
 		Called by breve each tick, this function handles the process of moving
@@ -131,6 +154,7 @@ class System(breve.Control):
 		start_time = time.time() #Used to calculate the speed of the simulation.
 		
 		new_field = map.Field(self._field.getDimensions())
+		shared.CLOCK = self._tick
 		
 		#Draw walls.
 		for wall in shared.WALLS:
@@ -150,16 +174,24 @@ class System(breve.Control):
 				threat.act(self._field, new_field)
 				new_field.getSpace(threat.getPosition()).addAgent(threat)
 				
-		#Update the unts and add the hills.
-		unts = []
+		#Fix the turn order of the active unts before any more are dispatched.
+		unts = shared.UNTS.shuffle(shared.RANDOMIZER)
+		active = len(unts)
+		
+		#Add the hills, tend to their builders, and dispatch resting unts.
 		for colony in shared.COLONIES:
-			unts += colony.getArchitects()
 			for hill in colony.getHills():
 				hill.plant(new_field)
-				unts += hill.getUnts()
-		shared.RANDOMIZER.shuffle(unts)
-		for unt in unts:
-			if unt.tick():
+				for unt in hill.getBuilders() + hill.takeRestingUnts():
+					self._field.countAgent((type(unt), unt.getColony()), unt.getPosition()) #The old field lacks unts spawned on the last tick.
+					if unt.tick():
+						unt.act(self._field, new_field)
+						new_field.getSpace(unt.getPosition()).addAgent(unt)
+						
+		#Update the active unts; those dispatched this tick will move on the next.
+		for i in range(active):
+			unt = unts[i]
+			if unt.isAlive() and unt.tick():
 				unt.act(self._field, new_field)
 				new_field.getSpace(unt.getPosition()).addAgent(unt)
 				
@@ -168,12 +200,46 @@ class System(breve.Control):
 			colony.tick()
 			
 		#Finalize the transition.
+		(query_hits, query_misses) = self._field.getQueryStatistics()
 		self._field = new_field
 		self._tick += 1
 		
 		#Print statistics about the transition.
-		print "Iteration: %i; time taken: %fs; pheromones: %i; agents: %i" % \
-		 (self._tick, time.time() - start_time, pheromones_processed, len(shared.AGENTS))
+		statuses = shared.STATUS_NAMES.items()
+		statuses.sort()
+		populations = []
+		for (status, name) in statuses:
+			population = shared.CENSUS.count(None, status)
+			if population:
+				populations.append("%s %i" % (name, population))
+		print "Iteration: %i; time taken: %fs; pheromones: %i; evicted: %i; agents: %i (%s); cached queries: %i/%i" % \
+		 (self._tick, time.time() - start_time, pheromones_processed, new_field.getEvictions(), len(shared.AGENTS), ', '.join(populations), query_hits, query_hits + query_misses)
+		
+	def removeWall(self, wall):
+		"""
+		Takes a wall off the field while the simulation is running; it will no
+		longer be drawn from the next tick onwards.
+		
+		@type wall: inerts.BaseWall
+		@param wall: The wall to be removed.
+		
+		@return: Nothing.
+		"""
+		while wall in shared.WALLS:
+			shared.WALLS.remove(wall)
+		wall.makeInvisible()
+		self._refreshTerrain(wall.getPosition())
+		
+	def _refreshTerrain(self, position):
+		"""
+		Brings shared.TERRAIN up to date with the walls in a space.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the space.
+		
+		@return: Nothing.
+		"""
+		shared.TERRAIN.refresh(position, [wall for wall in shared.WALLS if wall.getPosition() == position])
 breve.System = System
 
 System() #Start the simulation.
@@ -0,0 +1,800 @@
+# -*- coding: utf-8 -*-
+"""
+Unts module: terrain; contains persistent knowledge about the parts of the
+field that do not change from one tick to the next.
+"""
+from shared import *
+import inerts
+import map
+
+import array
+import heapq
+
+UNREACHABLE = -1 #: The distance given to spaces that cannot be reached at all.
+
+class Terrain(object):
+	"""
+	The layout of the walls and sponges on the field.
+	
+	Fields are rebuilt every tick, but walls only move when a scenario moves
+	them, so anything that depends on walls alone, like the distance fields
+	that guide unts home, is derived from this instead. Each change bumps the
+	terrain's version, which lets derived data tell when it is stale, and
+	getChanges() tells it which spaces to repair.
+	"""
+	_dimensions = None #: The (width, height) dimensions of the field.
+	_chunk_size = None #: The width of the square chunks used by planRoute(), or None if routes are not planned.
+	_chunks = None #: The chunks that have been built so far, keyed by (x, y) chunk co-ordinates; see getChunk().
+	_links = None #: The spaces in neighbouring chunks that can be entered from each portal, keyed by the portal's (x, y) co-ordinates.
+	_walls = None #: For every space, in row-major order, 1 if a wall impedes movement and sight.
+	_sponges = None #: For every space, in row-major order, 1 if a wall or sponge absorbs pheromones.
+	_version = 0 #: The number of changes that have been made to this terrain.
+	_changes = None #: The (x, y) co-ordinates of the space affected by each change, in order.
+	_resource_maps = None #: (ranks, indices) arrays describing the first resource visible from every space, keyed by (sight, resource type); see findResource().
+	_resource_count = 0 #: The number of resources that existed when _resource_maps was built.
+	
+	def __init__(self, dimensions, walls, chunk_size=None):
+		"""
+		Creates a new Terrain.
+		
+		@type dimensions: tuple
+		@param dimensions: The (width, height) dimensions of the field.
+		@type walls: sequence
+		@param walls: The inerts.Sponge and inerts.Wall objects on the field.
+		@type chunk_size: int
+		@param chunk_size: The width of the square chunks into which the field
+		    is divided for planRoute(), or None if routes will not be planned.
+		"""
+		self._dimensions = (width, height) = dimensions
+		self._chunk_size = chunk_size or None
+		self._chunks = {}
+		self._links = {}
+		self._changes = []
+		self._walls = array.array('b', [0]) * (width * height)
+		self._sponges = array.array('b', [0]) * (width * height)
+		self._resource_maps = {}
+		for wall in walls:
+			(x, y) = wall.getPosition()
+			index = y * width + x
+			self._sponges[index] = 1
+			if type(wall) is inerts.Wall:
+				self._walls[index] = 1
+				
+	def buildDistanceField(self, sources, origin=(0, 0), dimensions=None):
+		"""
+		Computes, for every space in a region, the number of steps needed to
+		reach the nearest of the specified positions when moving in any of the
+		eight directions without entering a wall or leaving the region.
+		
+		@type sources: sequence
+		@param sources: The (x, y) co-ordinates, within the region, from which
+		    distances are measured.
+		@type origin: tuple
+		@param origin: The (x, y) co-ordinates of the region's top-left space.
+		@type dimensions: tuple
+		@param dimensions: The (width, height) dimensions of the region. The
+		    whole field is used if not specified.
+		
+		@rtype: array.array
+		@return: The distance for every space in the region, in row-major
+		    order, or UNREACHABLE if no path exists.
+		"""
+		field_width = self._dimensions[0]
+		(o_x, o_y) = origin
+		(width, height) = dimensions or self._dimensions
+		walls = self._walls
+		distances = array.array('i', [UNREACHABLE]) * (width * height)
+		frontier = []
+		for (x, y) in sources:
+			index = (y - o_y) * width + (x - o_x)
+			if distances[index] == UNREACHABLE:
+				distances[index] = 0
+				frontier.append((x, y))
+				
+		distance = 0
+		while frontier:
+			distance += 1
+			next_frontier = []
+			for (x, y) in frontier:
+				for (x_offset, y_offset) in map.DIRECTION_OFFSETS:
+					n_x = x + x_offset
+					n_y = y + y_offset
+					if o_x <= n_x < o_x + width and o_y <= n_y < o_y + height:
+						index = (n_y - o_y) * width + (n_x - o_x)
+						if distances[index] == UNREACHABLE and not walls[n_y * field_width + n_x]:
+							distances[index] = distance
+							next_frontier.append((n_x, n_y))
+			frontier = next_frontier
+		return distances
+		
+	def findResource(self, position, sight, types):
+		"""
+		Finds the resource that an agent at a position would see first, as
+		objectsInLoS() would report it.
+		
+		This takes the same small amount of time wherever the agent is: a map
+		is built the first time each sight range and resource type is
+		requested, and kept until the walls or resources change.
+		
+		Note:: A resource counts as visible if the straight path from it to the
+		position is clear. Field.getSpacesInSight() also hides spaces that lie
+		on other spaces' blocked paths, so the two can disagree near the ends
+		of walls.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the agent.
+		@type sight: int
+		@param sight: The range that the agent can see.
+		@type types: sequence
+		@param types: The inerts.Resource subclasses being sought.
+		
+		@rtype: inerts.Resource
+		@return: The first resource that can be seen, or None if there is none.
+		"""
+		if not self._resource_count == len(RESOURCES):
+			self._resource_maps = {}
+			self._resource_count = len(RESOURCES)
+			
+		(x, y) = position
+		index = y * self._dimensions[0] + x
+		best = None
+		best_rank = None
+		for resource_type in types:
+			(ranks, indices) = self._getResourceMap(sight, resource_type)
+			rank = ranks[index]
+			if rank >= 0 and (best is None or rank < best_rank):
+				best = RESOURCES[indices[index]]
+				best_rank = rank
+		return best
+		
+	def getChanges(self, version):
+		"""
+		Lists the spaces that have changed since a version of this terrain.
+		
+		@type version: int
+		@param version: A version previously returned by getVersion().
+		
+		@rtype: list
+		@return: The (x, y) co-ordinates of each space changed since then, in
+		    order; a space may appear more than once.
+		"""
+		return self._changes[version:]
+		
+	def getChunk(self, position):
+		"""
+		Returns the chunk that contains a position, building it if necessary.
+		
+		A chunk's portals are the middle spaces of each open stretch along its
+		borders with its neighbours, and the ends of any diagonal step across a
+		border between two blocked spaces; the space on the other side of the
+		border from each portal is a portal of the neighbouring chunk, and the
+		two are linked.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of a space on the field.
+		
+		@rtype: tuple
+		@return: The (x, y) co-ordinates of the chunk's top-left space, its
+		    (width, height) dimensions, and a dictionary that maps the (x, y)
+		    co-ordinates of each of its portals to a distance field, built by
+		    buildDistanceField(), that covers only the chunk.
+		"""
+		size = self._chunk_size
+		key = (position[0] / size, position[1] / size)
+		chunk = self._chunks.get(key)
+		if chunk is None:
+			(width, height) = self._dimensions
+			origin = (o_x, o_y) = (key[0] * size, key[1] * size)
+			dimensions = (min(size, width - o_x), min(size, height - o_y))
+			fields = {}
+			for (portal, partner) in self._findEntrances(origin, dimensions):
+				if not portal in fields:
+					fields[portal] = self.buildDistanceField((portal,), origin, dimensions)
+				links = self._links.setdefault(portal, [])
+				if not partner in links:
+					links.append(partner)
+			chunk = self._chunks[key] = (origin, dimensions, fields)
+		return chunk
+		
+	def getChunkSize(self):
+		"""
+		Returns the width of the chunks used by planRoute().
+		
+		@rtype: int
+		@return: The width of the chunks, or None if routes are not planned.
+		"""
+		return self._chunk_size
+		
+	def getDimensions(self):
+		"""
+		Returns the dimensions of the field.
+		
+		@rtype: tuple
+		@return: The (width, height) dimensions of the field.
+		"""
+		return self._dimensions
+		
+	def getDownhillDirection(self, distances, position, preferred):
+		"""
+		Determines which way to step from a position to get closer to the
+		sources of a distance field.
+		
+		@type distances: array.array
+		@param distances: A distance field built by buildDistanceField().
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the space being left.
+		@type preferred: int
+		@param preferred: The index, in map.DIRECTIONS, of the direction to take
+		    if it leads downhill; other directions are tried clockwise from it.
+		
+		@rtype: int
+		@return: The index, in map.DIRECTIONS, of a direction that leads
+		    downhill, or None if the position is already at a source or cannot
+		    reach one.
+		"""
+		(width, height) = self._dimensions
+		(x, y) = position
+		best = distances[y * width + x]
+		if best <= 0:
+			return None
+			
+		direction = None
+		for step in range(8):
+			candidate = (preferred + step) % 8
+			(x_offset, y_offset) = map.DIRECTION_OFFSETS[candidate]
+			n_x = x + x_offset
+			n_y = y + y_offset
+			if 0 <= n_x < width and 0 <= n_y < height:
+				distance = distances[n_y * width + n_x]
+				if distance != UNREACHABLE and distance < best:
+					best = distance
+					direction = candidate
+		return direction
+		
+	def getLinks(self, portal):
+		"""
+		Returns the spaces in neighbouring chunks that a portal leads to.
+		
+		Note:: The portal's chunk must already have been built by getChunk().
+		
+		@type portal: tuple
+		@param portal: The (x, y) co-ordinates of a space on the field.
+		
+		@rtype: list
+		@return: The (x, y) co-ordinates of each linked space, which is empty if
+		    the space is not a portal.
+		"""
+		return self._links.get(portal, [])
+		
+	def getSponges(self):
+		"""
+		Describes which spaces absorb pheromones.
+		
+		Caution:: The array returned is not a copy. Do not modify.
+		
+		@rtype: array.array
+		@return: For every space, in row-major order, 1 if a wall or sponge
+		    absorbs pheromones there.
+		"""
+		return self._sponges
+		
+	def getVersion(self):
+		"""
+		Indicates how many changes have been made to this terrain, so that data
+		derived from it can be rebuilt when it goes stale.
+		
+		@rtype: int
+		@return: This terrain's version.
+		"""
+		return self._version
+		
+	def isPathClear(self, start, end, pheromone=False):
+		"""
+		Determines whether end can be reached from start, stepping exactly as
+		map.Field.clearPath() does.
+		
+		@type start: tuple
+		@param start: The (x, y) co-ordinates at which pathfinding will begin.
+		@type end: tuple
+		@param end: The (x, y) co-ordinate that is being sought.
+		@type pheromone: bool
+		@param pheromone: True if sponges should be considered walls.
+		
+		@rtype: bool
+		@return: True if the path is clear.
+		"""
+		(width, height) = self._dimensions
+		if pheromone:
+			blocked = self._sponges
+		else:
+			blocked = self._walls
+			
+		(x, y) = start
+		(x_end, y_end) = end
+		while not (x == x_end and y == y_end):
+			(x_offset, y_offset) = map.DIRECTION_OFFSETS[map.findDirection((x, y), end)]
+			x += x_offset
+			y += y_offset
+			if not (0 <= x < width and 0 <= y < height):
+				break
+			if blocked[y * width + x]:
+				return False
+		return True
+		
+	def isOpen(self, position, pheromone=False):
+		"""
+		Indicates whether entities can pass through or be detected through a
+		space.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the space.
+		@type pheromone: bool
+		@param pheromone: True if only pheromone entities should be considered.
+		
+		@rtype: bool
+		@return: True if the space is open, or False if it is off the field.
+		"""
+		(width, height) = self._dimensions
+		(x, y) = position
+		if not (0 <= x < width and 0 <= y < height):
+			return False
+		if pheromone:
+			return not self._sponges[y * width + x]
+		return not self._walls[y * width + x]
+		
+	def planRoute(self, goals):
+		"""
+		Begins a search for the way to the nearest of the specified positions.
+		
+		Rather than covering the whole field, as buildDistanceField() does, the
+		search moves between chunk portals and only goes as far as the
+		positions it is asked about require, so it remains practical on very
+		large fields. Routes may be a few steps longer than the shortest ones.
+		
+		Caution:: The terrain must have been created with a chunk size.
+		
+		@type goals: sequence
+		@param goals: The (x, y) co-ordinates being sought.
+		
+		@rtype: Route
+		@return: A route that leads to the goals from anywhere on the field.
+		"""
+		return Route(self, goals)
+		
+	def refresh(self, position, walls):
+		"""
+		Updates a space after walls or sponges have been added to or removed
+		from it.
+		
+		Only what passes through the space is discarded: the resource maps of
+		the spaces that can see across it, and the chunks that it borders.
+		Distance fields are left for their owners to fix with
+		repairDistanceField().
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the space.
+		@type walls: sequence
+		@param walls: The inerts.Sponge and inerts.Wall objects that are now in
+		    the space.
+		
+		@return: Nothing.
+		"""
+		(width, height) = self._dimensions
+		(x, y) = position
+		index = y * width + x
+		wall = 0
+		for obstacle in walls:
+			if type(obstacle) is inerts.Wall:
+				wall = 1
+		self._sponges[index] = walls and 1 or 0
+		if self._walls[index] == wall: #Nothing that can be seen or walked changed.
+			return
+		self._walls[index] = wall
+		self._version += 1
+		self._changes.append(position)
+		
+		for (sight, resource_type) in self._resource_maps.keys():
+			self._repairResourceMap(position, sight, resource_type)
+			
+		if self._chunk_size: #Portals on a border depend on the spaces on both sides.
+			for (n_x, n_y) in [position] + self._getNeighbours(position):
+				key = (n_x / self._chunk_size, n_y / self._chunk_size)
+				chunk = self._chunks.get(key)
+				if chunk:
+					del self._chunks[key]
+					for portal in chunk[2].keys():
+						del self._links[portal]
+						
+	def repairDistanceField(self, distances, position):
+		"""
+		Updates a distance field built by buildDistanceField() for the whole
+		field after a space has changed, recomputing only the spaces whose
+		distances the change affects.
+		
+		Caution:: A source that has been walled over is not restored when the
+		wall is removed; rebuild the field in that case.
+		
+		@type distances: array.array
+		@param distances: The distance field to update.
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of a space returned by
+		    getChanges().
+		
+		@return: Nothing.
+		"""
+		(width, height) = self._dimensions
+		walls = self._walls
+		(x, y) = position
+		index = y * width + x
+		frontier = []
+		if walls[index]:
+			if distances[index] == UNREACHABLE:
+				return
+				
+			#Find every space that no longer has a neighbour one step closer.
+			orphans = {index: None}
+			distance = distances[index]
+			distances[index] = UNREACHABLE
+			level = [position]
+			while level:
+				distance += 1
+				next_level = []
+				for (x, y) in level:
+					for (n_x, n_y) in self._getNeighbours((x, y)):
+						n_index = n_y * width + n_x
+						if distances[n_index] == distance and not n_index in orphans:
+							supported = False
+							for (s_x, s_y) in self._getNeighbours((n_x, n_y)):
+								s_index = s_y * width + s_x
+								if distances[s_index] == distance - 1 and not s_index in orphans:
+									supported = True
+									break
+							if not supported:
+								orphans[n_index] = (n_x, n_y)
+								next_level.append((n_x, n_y))
+				level = next_level
+				
+			#Let the orphans settle on whatever routes remain.
+			del orphans[index]
+			for o_index in orphans.keys():
+				distances[o_index] = UNREACHABLE
+			for (o_index, (o_x, o_y)) in orphans.items():
+				for (n_x, n_y) in self._getNeighbours((o_x, o_y)):
+					distance = distances[n_y * width + n_x]
+					if distance != UNREACHABLE and not walls[n_y * width + n_x]:
+						heapq.heappush(frontier, (distance + 1, (o_x, o_y)))
+		else:
+			for (n_x, n_y) in self._getNeighbours(position):
+				distance = distances[n_y * width + n_x]
+				if distance != UNREACHABLE and not walls[n_y * width + n_x]:
+					heapq.heappush(frontier, (distance + 1, position))
+					
+		while frontier:
+			(distance, (x, y)) = heapq.heappop(frontier)
+			index = y * width + x
+			if distances[index] != UNREACHABLE and distances[index] <= distance:
+				continue
+			distances[index] = distance
+			for (n_x, n_y) in self._getNeighbours((x, y)):
+				n_index = n_y * width + n_x
+				if not walls[n_index] and (distances[n_index] == UNREACHABLE or distances[n_index] > distance + 1):
+					heapq.heappush(frontier, (distance + 1, (n_x, n_y)))
+					
+	def _findEntrances(self, origin, dimensions):
+		"""
+		Finds the places where a chunk can be left for each of its neighbours,
+		including those that only touch it diagonally.
+		
+		@type origin: tuple
+		@param origin: The (x, y) co-ordinates of the chunk's top-left space.
+		@type dimensions: tuple
+		@param dimensions: The (width, height) dimensions of the chunk.
+		
+		@rtype: list
+		@return: A list of ((x, y), (x, y)) pairs, each holding a portal within
+		    the chunk and the space in the neighbouring chunk that it leads to.
+		"""
+		(width, height) = self._dimensions
+		(o_x, o_y) = origin
+		(c_width, c_height) = dimensions
+		columns = range(o_x, o_x + c_width)
+		rows = range(o_y, o_y + c_height)
+		borders = []
+		if o_x + c_width < width:
+			borders.append(([(o_x + c_width - 1, y) for y in rows], (1, 0)))
+		if o_x > 0:
+			borders.append(([(o_x, y) for y in rows], (-1, 0)))
+		if o_y + c_height < height:
+			borders.append(([(x, o_y + c_height - 1) for x in columns], (0, 1)))
+		if o_y > 0:
+			borders.append(([(x, o_y) for x in columns], (0, -1)))
+			
+		entrances = []
+		for (spaces, (x_offset, y_offset)) in borders:
+			stretch = []
+			for space in spaces + [None]: #The sentinel closes the last stretch.
+				if space is not None and self.isOpen(space) and self.isOpen((space[0] + x_offset, space[1] + y_offset)):
+					stretch.append(space)
+				elif stretch:
+					(x, y) = stretch[len(stretch) / 2]
+					entrances.append(((x, y), (x + x_offset, y + y_offset)))
+					stretch = []
+					
+			#A diagonal step across the border only needs a portal of its own if
+			#both spaces it cuts between are blocked; otherwise, straight
+			#crossings already join the stretches on either side of it.
+			(x_along, y_along) = (abs(y_offset), abs(x_offset))
+			for (x, y) in spaces:
+				if not self.isOpen((x, y)) or self.isOpen((x + x_offset, y + y_offset)):
+					continue
+				for step in (-1, 1):
+					partner = (x + x_offset + x_along * step, y + y_offset + y_along * step)
+					if self.isOpen(partner) and not self.isOpen((x + x_along * step, y + y_along * step)):
+						if not ((x, y), partner) in entrances: #Corners are scanned from both of their borders.
+							entrances.append(((x, y), partner))
+		return entrances
+		
+	def _getNeighbours(self, position):
+		"""
+		Lists the spaces around a position that lie on the field.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of a space.
+		
+		@rtype: list
+		@return: The (x, y) co-ordinates of each neighbouring space.
+		"""
+		(width, height) = self._dimensions
+		(x, y) = position
+		neighbours = []
+		for (x_offset, y_offset) in map.DIRECTION_OFFSETS:
+			(n_x, n_y) = (x + x_offset, y + y_offset)
+			if 0 <= n_x < width and 0 <= n_y < height:
+				neighbours.append((n_x, n_y))
+		return neighbours
+		
+	def _getResourceMap(self, sight, resource_type):
+		"""
+		Returns the map of the first resource of a type that is visible from
+		every space, building it if necessary.
+		
+		Rather than searching the sight of every space, each resource is
+		spread outwards over the spaces that would see it.
+		
+		@type sight: int
+		@param sight: The range that the agents using the map can see.
+		@type resource_type: type
+		@param resource_type: The inerts.Resource subclass being mapped.
+		
+		@rtype: tuple
+		@return: Two arrays covering every space, in row-major order: the rank,
+		    within map.getSenseOffsets(sight), at which the first visible
+		    resource appears, and the index of that resource within
+		    shared.RESOURCES. Both are -1 where nothing is visible.
+		"""
+		key = (sight, resource_type)
+		resource_map = self._resource_maps.get(key)
+		if resource_map is None:
+			(width, height) = self._dimensions
+			ranks = array.array('i', [-1]) * (width * height)
+			indices = array.array('i', [-1]) * (width * height)
+			offsets = map.getSenseOffsets(sight)
+			for (i, resource) in enumerate(RESOURCES):
+				if not type(resource) is resource_type:
+					continue
+					
+				resource_position = (r_x, r_y) = resource.getPosition()
+				for (rank, (x_offset, y_offset)) in enumerate(offsets):
+					x = r_x - x_offset
+					y = r_y - y_offset
+					if 0 <= x < width and 0 <= y < height:
+						index = y * width + x
+						if (ranks[index] < 0 or rank < ranks[index]) and self.isPathClear(resource_position, (x, y)):
+							ranks[index] = rank
+							indices[index] = i
+			resource_map = self._resource_maps[key] = (ranks, indices)
+		return resource_map
+		
+	def _repairResourceMap(self, position, sight, resource_type):
+		"""
+		Recomputes the part of a resource map that can see across a changed
+		space.
+		
+		A path between a resource and a space that sees it stays within the
+		rectangle they span, so only the spaces within sight of the change, on
+		either axis, are looked at again.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the changed space.
+		@type sight: int
+		@param sight: The sight range of the map.
+		@type resource_type: type
+		@param resource_type: The inerts.Resource subclass of the map.
+		
+		@return: Nothing.
+		"""
+		(width, height) = self._dimensions
+		(ranks, indices) = self._resource_maps[(sight, resource_type)]
+		locations = {}
+		for (i, resource) in enumerate(RESOURCES):
+			if type(resource) is resource_type:
+				locations.setdefault(resource.getPosition(), i)
+		offsets = map.getSenseOffsets(sight)
+		
+		(x, y) = position
+		for o_y in range(max(0, y - sight), min(height, y + sight + 1)):
+			for o_x in range(max(0, x - sight), min(width, x + sight + 1)):
+				index = o_y * width + o_x
+				ranks[index] = indices[index] = -1
+				for (rank, (x_offset, y_offset)) in enumerate(offsets):
+					resource_position = (o_x + x_offset, o_y + y_offset)
+					i = locations.get(resource_position)
+					if i is not None and self.isPathClear(resource_position, (o_x, o_y)):
+						ranks[index] = rank
+						indices[index] = i
+						break
+		
+		
+class Route(object):
+	"""
+	A search, over a terrain's chunks, for the way to the nearest of a set of
+	goals.
+	
+	The search spreads outwards from the goals through the portals of each
+	chunk, and is only continued when a position is asked about whose
+	distance is not yet certain. Inside a chunk, unts step downhill on the
+	distance fields of its portals.
+	"""
+	_terrain = None #: The Terrain being searched.
+	_goal_fields = None #: Distance fields from the goals within each chunk that contains any, keyed by the (x, y) co-ordinates of the chunk's top-left space.
+	_distances = None #: The number of steps from each portal reached so far to the nearest goal.
+	_frontier = None #: A heap of (distance, portal) pairs that have yet to be settled.
+	
+	def __init__(self, terrain, goals):
+		"""
+		Creates a new Route.
+		
+		@type terrain: Terrain
+		@param terrain: The terrain to be searched, which must have a chunk
+		    size.
+		@type goals: sequence
+		@param goals: The (x, y) co-ordinates being sought.
+		"""
+		self._terrain = terrain
+		self._goal_fields = {}
+		self._distances = {}
+		self._frontier = []
+		
+		chunk_goals = {}
+		for goal in goals:
+			chunk_goals.setdefault(terrain.getChunk(goal)[0], []).append(goal)
+		for goals in chunk_goals.values():
+			(origin, dimensions, fields) = terrain.getChunk(goals[0])
+			field = self._goal_fields[origin] = terrain.buildDistanceField(goals, origin, dimensions)
+			for portal in fields.keys():
+				distance = field[_getLocalIndex(origin, dimensions, portal)]
+				if distance != UNREACHABLE:
+					heapq.heappush(self._frontier, (distance, portal))
+					
+	def getDirection(self, position, preferred):
+		"""
+		Determines which way to step from a position to get closer to the
+		goals.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of the space being left.
+		@type preferred: int
+		@param preferred: The index, in map.DIRECTIONS, of the direction to take
+		    if it leads closer; other directions are tried clockwise from it.
+		
+		@rtype: int
+		@return: The index, in map.DIRECTIONS, of a direction that leads closer
+		    to the goals, or None if the position is already at a goal or
+		    cannot reach one.
+		"""
+		(origin, dimensions, fields) = chunk = self._terrain.getChunk(position)
+		best = self._settle(position, chunk)
+		if not best:
+			return None
+			
+		(x, y) = position
+		(o_x, o_y) = origin
+		(c_width, c_height) = dimensions
+		links = self._terrain.getLinks(position)
+		direction = None
+		for step in range(8):
+			candidate = (preferred + step) % 8
+			(x_offset, y_offset) = map.DIRECTION_OFFSETS[candidate]
+			neighbour = (n_x, n_y) = (x + x_offset, y + y_offset)
+			if o_x <= n_x < o_x + c_width and o_y <= n_y < o_y + c_height:
+				distance = self._estimate(neighbour, chunk)
+			elif neighbour in links:
+				distance = self._distances.get(neighbour)
+			else: #Chunks are only left through portals.
+				continue
+			if distance is not None and distance < best:
+				best = distance
+				direction = candidate
+		return direction
+		
+	def _estimate(self, position, chunk):
+		"""
+		Determines the shortest distance from a position to the goals by way of
+		any portal of its chunk that has been settled, or any goal within it.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of a space.
+		@type chunk: tuple
+		@param chunk: The chunk containing the space, as returned by
+		    Terrain.getChunk().
+		
+		@rtype: int
+		@return: The distance, or None if no route has been found.
+		"""
+		(origin, dimensions, fields) = chunk
+		index = _getLocalIndex(origin, dimensions, position)
+		best = None
+		goal_field = self._goal_fields.get(origin)
+		if goal_field is not None and goal_field[index] != UNREACHABLE:
+			best = goal_field[index]
+		for (portal, field) in fields.items():
+			distance = self._distances.get(portal)
+			if distance is not None and field[index] != UNREACHABLE:
+				distance += field[index]
+				if best is None or distance < best:
+					best = distance
+		return best
+		
+	def _settle(self, position, chunk):
+		"""
+		Continues the search until the distance from a position to the goals is
+		certain.
+		
+		@type position: tuple
+		@param position: The (x, y) co-ordinates of a space.
+		@type chunk: tuple
+		@param chunk: The chunk containing the space, as returned by
+		    Terrain.getChunk().
+		
+		@rtype: int
+		@return: The distance, or None if the goals cannot be reached.
+		"""
+		terrain = self._terrain
+		distances = self._distances
+		frontier = self._frontier
+		while True:
+			best = self._estimate(position, chunk)
+			if not frontier or (best is not None and frontier[0][0] >= best):
+				return best
+				
+			(distance, portal) = heapq.heappop(frontier)
+			if portal in distances:
+				continue
+			distances[portal] = distance
+			
+			(origin, dimensions, fields) = terrain.getChunk(portal)
+			index = _getLocalIndex(origin, dimensions, portal)
+			for (other, field) in fields.items():
+				if field[index] != UNREACHABLE and not other in distances:
+					heapq.heappush(frontier, (distance + field[index], other))
+			for partner in terrain.getLinks(portal):
+				if not partner in distances:
+					heapq.heappush(frontier, (distance + 1, partner))
+					
+					
+def _getLocalIndex(origin, dimensions, position):
+	"""
+	Converts a position into an index within a region's distance field.
+	
+	@type origin: tuple
+	@param origin: The (x, y) co-ordinates of the region's top-left space.
+	@type dimensions: tuple
+	@param dimensions: The (width, height) dimensions of the region.
+	@type position: tuple
+	@param position: The (x, y) co-ordinates of a space within the region.
+	
+	@rtype: int
+	@return: The index of the space.
+	"""
+	return (position[1] - origin[1]) * dimensions[0] + (position[0] - origin[0])
+	
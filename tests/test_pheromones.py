@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Unts tests: pheromones; pins the way deposited pheromones decay and disperse.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared import *
+import seed
+import shared
+shared.initialize(seed.environment)
+import map
+import terrain
+
+class PheromoneDecayTest(unittest.TestCase):
+	"""
+	Follows a single deposit from field to field.
+	"""
+	def setUp(self):
+		shared.ENVIRONMENT.SIGNALS_DISPERSION_FACTOR = 0.8
+		shared.ENVIRONMENT.SIGNALS_COLLISION_FACTOR = 0.25
+		shared.ENVIRONMENT.SIGNALS_DIFFUSION = 0.0
+		shared.ENVIRONMENT.SIGNALS_BUDGET = 0
+		shared.CLOCK = 0
+		
+	def _trace(self, intensity):
+		"""
+		Deposits a pheromone on tick 0 and flows it until it disperses.
+		
+		@rtype: list
+		@return: The pheromone's strength after each flow, followed by the tick
+		    on which it had dispersed.
+		"""
+		field = map.Field((10, 10))
+		field.getSpace((5, 5)).addPheromone(RESOURCE_FOOD, None, intensity)
+		trace = []
+		for tick in range(1, 50):
+			shared.CLOCK = tick
+			new_field = map.Field((10, 10))
+			new_field.flowPheromones(field)
+			field = new_field
+			pheromones = field.getPheromones()
+			if not pheromones:
+				trace.append(tick)
+				return trace
+			trace.append(round(pheromones[0].getIntensity(), 6))
+		return trace
+		
+	def testDecaySequence(self):
+		self.assertEqual(self._trace(100.0)[:4], [80.0, 64.0, 51.2, 40.96])
+		
+	def testExpiry(self):
+		self.assertEqual(self._trace(100.0)[-1], 21)
+		self.assertEqual(self._trace(2.0), [1.6, 1.28, 1.024, 4])
+		self.assertEqual(self._trace(0.5), [1])
+		
+		
+class PheromoneDiffusionTest(unittest.TestCase):
+	"""
+	Follows a single deposit as it spreads across an open field.
+	"""
+	def setUp(self):
+		shared.ENVIRONMENT.SIGNALS_DISPERSION_FACTOR = 0.8
+		shared.ENVIRONMENT.SIGNALS_COLLISION_FACTOR = 0.25
+		shared.ENVIRONMENT.SIGNALS_DIFFUSION = 0.2
+		shared.ENVIRONMENT.SIGNALS_BUDGET = 0
+		shared.CLOCK = 0
+		shared.TERRAIN = terrain.Terrain((20, 20), ())
+		
+	def tearDown(self):
+		shared.ENVIRONMENT.SIGNALS_DIFFUSION = 0.0
+		shared.TERRAIN = None
+		
+	def testDispersal(self):
+		field = map.Field((20, 20))
+		field.getSpace((10, 10)).addPheromone(RESOURCE_FOOD, None, 100.0)
+		for tick in range(1, 50):
+			shared.CLOCK = tick
+			new_field = map.Field((20, 20))
+			new_field.flowPheromones(field)
+			field = new_field
+			pheromones = field.getPheromones()
+			if not pheromones:
+				break
+			for pheromone in pheromones:
+				self.assert_(pheromone.getIntensity() >= 1)
+		self.assertEqual(pheromones, [])
+		self.assert_(tick <= 21)
+		
+		
+if __name__ == '__main__':
+	unittest.main()
+	
\ No newline at end of file
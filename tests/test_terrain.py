@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Unts tests: terrain; checks that routes planned over chunks reach what the
+whole field can.
+"""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared import *
+import seed
+import shared
+shared.initialize(seed.environment)
+import inerts
+import terrain
+
+class RouteReachabilityTest(unittest.TestCase):
+	"""
+	Compares planRoute() with buildDistanceField() on random maps.
+	"""
+	def _check(self, generator, dimensions, chunk_size, density):
+		"""
+		Scatters walls over a field and checks that a route leads away from
+		every open space exactly when the full distance field can reach a goal
+		from it.
+		"""
+		(width, height) = dimensions
+		walls = []
+		open_spaces = []
+		for y in range(height):
+			for x in range(width):
+				if generator.random() < density:
+					walls.append(inerts.Wall((x, y)))
+				else:
+					open_spaces.append((x, y))
+		field = terrain.Terrain(dimensions, walls, chunk_size)
+		goals = generator.sample(open_spaces, generator.randint(1, 3))
+		distances = field.buildDistanceField(goals)
+		route = field.planRoute(goals)
+		for (x, y) in open_spaces:
+			if (x, y) in goals:
+				continue
+			reachable = distances[y * width + x] != terrain.UNREACHABLE
+			planned = route.getDirection((x, y), 0) is not None
+			self.assertEqual(planned, reachable, "%s: %s" % ((x, y), reachable))
+			
+	def testRandomMaps(self):
+		generator = random.Random(1)
+		for trial in range(20):
+			self._check(generator, (40, 30), generator.choice((4, 5, 8, 16)), generator.choice((0.2, 0.3, 0.4)))
+			
+			
+if __name__ == '__main__':
+	unittest.main()
+	
\ No newline at end of file